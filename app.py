@@ -1,32 +1,46 @@
+import json
+import uuid
+import time
+
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 from streamlit_folium import st_folium
 import folium
 
-from utils.weather import fetch_pvgis_tmy
-from utils.simulation import simulate_energy_output
-from utils.financials import calculate_financials
-from utils.report import export_to_csv
-from utils.optimizer import optimize_tilt_azimuth
 from utils.curves import plot_iv_pv_curves
 from utils.panond_parser import parse_pan_file
 from utils.project_config import save_config, load_config
 from utils.visuals import plot_hourly_time_series, plot_loss_waterfall
-from utils.degradation import estimate_annual_degradation, simulate_lifetime_energy
-from utils.bom_validator import validate_bom
-from utils.risk_classifier import classify_degradation_risk, explain_risk_factors
-from utils.failure_predictor import predict_failure_modes
-from utils.test_recommender import recommend_tests
+from utils.degradation import simulate_lifetime_energy
 from utils.ai_recommender import recommend_bom
-from utils.risk_scorer import compute_risk_score
-from utils.report_generator import generate_pdf_report
+from utils.jobs import JobRegistry, job_key
+from utils.pipeline import run_site_analysis, MOUNT_LABELS
+from utils.project_store import ProjectStore
 
 st.set_page_config(page_title="PVSimApp - Phase 6", layout="centered")
 st.title("🔆 PVSimApp – Smart Solar Simulation (Phase 6)")
 
 modules_df = pd.read_csv("modules.csv")
 inverters_df = pd.read_csv("inverters.csv")
+# Column names expected by validate_bom / recommend_bom
+inverters_df["AC Power (kW)"] = inverters_df["Max AC Output (W)"] / 1000
+inverters_df["Max Input Voltage (V)"] = inverters_df["Max DC Voltage (V)"]
+
+
+@st.cache_resource
+def get_job_registry():
+    # Shared by every session in this server process, so identical runs are deduplicated
+    return JobRegistry(max_workers=4)
+
+
+@st.cache_resource
+def get_project_store():
+    return ProjectStore("pvsim_projects.db")
+
+
+registry = get_job_registry()
+store = get_project_store()
 
 if 'bom_b_data' not in st.session_state:
     st.session_state['bom_b_data'] = None
@@ -42,8 +56,13 @@ longitude = map_data["last_clicked"]["lng"] if map_data["last_clicked"] else def
 st.sidebar.markdown(f"**Latitude**: `{latitude:.4f}`, **Longitude**: `{longitude:.4f}`")
 
 st.sidebar.subheader("📐 Orientation")
-optimize = st.sidebar.checkbox("Auto Optimize Tilt/Azimuth", value=False)
-if not optimize:
+mount = st.sidebar.selectbox("Mounting", list(MOUNT_LABELS), format_func=MOUNT_LABELS.get)
+bifacial = st.sidebar.checkbox("Bifacial Modules", value=False)
+gcr = st.sidebar.slider("Ground Coverage Ratio", 0.2, 0.6, 0.35, 0.05) if mount == "tracker" or bifacial else None
+optimize = mount == "fixed" and st.sidebar.checkbox("Auto Optimize Tilt/Azimuth", value=False)
+if mount == "tracker":
+    tilt = azimuth = None
+elif not optimize:
     tilt = st.sidebar.slider("Tilt (°)", 0, 60, 30)
     azimuth = st.sidebar.slider("Azimuth (°)", 90, 270, 180)
 else:
@@ -71,93 +90,221 @@ loss_dict = {
     "Inverter": st.sidebar.slider("Inverter (%)", 0, 5, 2)
 }
 
-if st.sidebar.button("Run Simulation"):
-    weather = fetch_pvgis_tmy(latitude, longitude)
-    if isinstance(weather, pd.DataFrame):
-        if optimize:
-            tilt, azimuth, _ = optimize_tilt_azimuth(weather, latitude, longitude, system_kw)
-        st.success(f"Using Tilt={tilt}°, Azimuth={azimuth}°")
-
-        bom_feedback, issue_count = validate_bom(selected_module, selected_inverter, num_modules, (latitude, longitude), weather)
-        for item in bom_feedback:
-            st.write(item)
-
-        monthly_df, hourly_df = simulate_energy_output(weather, latitude, longitude, tilt, azimuth, system_kw)
-        monthly_df["Energy (kWh)"] *= (1 - sum(loss_dict.values()) / 100)
-
-        st.subheader("📊 Monthly Energy Output")
-        st.dataframe(monthly_df)
-        st.pyplot(plot_loss_waterfall(monthly_df["Energy (kWh)"].sum(), loss_dict))
-
-        st.subheader("📉 Degradation & Risk")
-        deg_rate = estimate_annual_degradation(hourly_df["Module Temp (°C)"])
-        risk_label = classify_degradation_risk(deg_rate)
-        explanation = explain_risk_factors(hourly_df["Module Temp (°C)"])
-        st.write(f"Estimated Annual Degradation: {deg_rate:.2f}%")
-        st.write(f"Risk: {risk_label}")
-        st.info(explanation)
-
-        st.subheader("⚠️ Failure & Testing")
-        failures = predict_failure_modes(selected_module, weather, encapsulant)
-        for f in failures:
-            st.write(f)
-        test_plan, rationale = recommend_tests(weather, encapsulant)
-        for k, v in test_plan.items():
-            st.write(f"{k}: {v}")
-
-        st.subheader("📊 Risk Scoring & Financials")
-        risk_score, risk_rating = compute_risk_score(deg_rate, test_plan, failures)
-        cost_per_kw = st.number_input("System Cost ($/kW)", value=1200)
-        rate = st.number_input("Electricity Rate ($/kWh)", value=0.12)
-        fin = calculate_financials(system_kw, cost_per_kw, rate, monthly_df)
-        for k, v in fin.items():
-            st.write(f"{k}: ${v:,.2f}" if "($)" in k else f"{k}: {v:.2f}")
-
-        st.subheader("📁 Export Options")
-        export_to_csv(monthly_df, "monthly_energy.csv")
-        with open("monthly_energy.csv", "rb") as f:
-            st.download_button("Download CSV", f, file_name="monthly_energy.csv")
+st.sidebar.subheader("💰 Financial Inputs")
+cost_per_kw = st.sidebar.number_input("System Cost ($/kW)", value=1200)
+rate = st.sidebar.number_input("Electricity Rate ($/kWh)", value=0.12)
 
-        if st.button("📄 Export PDF Report"):
-            config = {
-                "Latitude": latitude,
-                "Longitude": longitude,
-                "Tilt": tilt,
-                "Azimuth": azimuth,
-                "Module": module_choice,
-                "Inverter": inverter_choice,
-                "Encapsulant": encapsulant,
-                "System Size (kW)": f"{system_kw:.2f}"
-            }
-
-            pdf_filename = "PVSim_Report.pdf"
-            generate_pdf_report(
-                filename=pdf_filename,
-                config=config,
-                monthly_df=monthly_df,
-                deg_rate=deg_rate,
-                risk_score=risk_score,
-                risk_label=risk_label,
-                failures=failures,
-                test_plan=test_plan,
-                financials=fin,
-                bom_b=st.session_state['bom_b_data']
+st.sidebar.subheader("🐞 Debug")
+show_timings = st.sidebar.checkbox("Show stage timings", value=False)
+
+run_clicked = st.sidebar.button("Run Simulation")
+params = {
+    "latitude": latitude,
+    "longitude": longitude,
+    "optimize": optimize,
+    "mount": mount,
+    "bifacial": bifacial,
+    "gcr": gcr,
+    "tilt": tilt,
+    "azimuth": azimuth,
+    "module": selected_module.to_dict(),
+    "inverter": selected_inverter.to_dict(),
+    "num_modules": num_modules,
+    "encapsulant": encapsulant,
+    "system_kw": system_kw,
+    "losses": loss_dict,
+    "cost_per_kw": cost_per_kw,
+    "energy_price": rate,
+    "bom_b": st.session_state['bom_b_data'],
+    "profile": show_timings,
+}
+
+
+if 'session_id' not in st.session_state:
+    st.session_state['session_id'] = uuid.uuid4().hex
+
+
+def subscriber(slot):
+    return f"{st.session_state['session_id']}/{slot}"
+
+
+def submit(slot, job_params):
+    st.session_state.pop('cancelled', None)
+    previous = st.session_state.get(slot)
+    job = registry.submit(run_site_analysis, job_params, subscriber(slot))
+    st.session_state[slot] = job
+    if previous is not None and previous is not job:
+        registry.release(previous, subscriber(slot))
+
+
+def release(slot):
+    job = st.session_state.pop(slot, None)
+    if job is not None:
+        registry.release(job, subscriber(slot))
+
+
+# After the first run, input changes re-run automatically; the stage cache
+# in utils.pipeline means only the stages downstream of the change recompute
+current_job = st.session_state.get('job')
+if run_clicked or (current_job is not None and current_job.key != job_key(params)):
+    submit('job', params)
+    release('report_job')
+
+
+def show_monthly(monthly_df):
+    st.subheader("📊 Monthly Energy Output")
+    st.dataframe(monthly_df)
+
+
+def show_results(result, params):
+    if params.get("mount") == "tracker":
+        st.success(f"Using single-axis tracker, axis azimuth {result['azimuth']}°")
+    else:
+        st.success(f"Using Tilt={result['tilt']}°, Azimuth={result['azimuth']}°")
+    for item in result["bom_feedback"]:
+        st.write(item)
+
+    monthly_df = result["monthly_df"]
+    show_monthly(monthly_df)
+    st.pyplot(plot_loss_waterfall(monthly_df["Energy (kWh)"].sum(), params["losses"]))
+
+    st.subheader("📉 Degradation & Risk")
+    st.write(f"Estimated Annual Degradation: {result['deg_rate']:.2f}%")
+    st.write(f"Risk: {result['risk_label']}")
+    st.info(result["explanation"])
+
+    st.subheader("⚠️ Failure & Testing")
+    for f in result["failures"]:
+        st.write(f)
+    for k, v in result["test_plan"].items():
+        st.write(f"{k}: {v}")
+
+    st.subheader("📊 Risk Scoring & Financials")
+    st.write(f"Risk Score: {result['risk_score']} ({result['risk_rating']})")
+    for k, v in result["financials"].items():
+        st.write(f"{k}: ${v:,.2f}" if "($)" in k else f"{k}: {v:.2f}")
+
+    st.subheader("📁 Export Options")
+    st.download_button("Download CSV", monthly_df.to_csv(index=False), file_name="monthly_energy.csv")
+    show_report_export(params)
+
+    if st.button("Set Current as BOM B"):
+        st.session_state['bom_b_data'] = {
+            "config": {
+                key: result["config"][key]
+                for key in ["Module", "Inverter", "Encapsulant", "System Size (kW)"]
+            },
+            "monthly_df": monthly_df,
+            "deg_rate": result["deg_rate"],
+            "risk_score": result["risk_score"],
+            "risk_label": result["risk_label"]
+        }
+        st.success("BOM B saved for comparison in next PDF export.")
+
+    scenario_name = st.text_input("Scenario Name", value="")
+    if st.button("💾 Save Scenario"):
+        config = dict(result["config"])
+        config.update({
+            "Number of Modules": params["num_modules"],
+            "Loss Factors (%)": params["losses"],
+            "System Cost ($/kW)": params["cost_per_kw"],
+            "Electricity Rate ($/kWh)": params["energy_price"],
+        })
+        scenario_id = store.save_scenario(config, result, name=scenario_name or None)
+        st.success(f"Saved scenario #{scenario_id}.")
+
+    trace = result.get("trace")
+    if trace is not None:
+        with st.expander("🐞 Stage Timings", expanded=True):
+            st.write(f"Recomputed stages: {', '.join(result['recomputed']) or 'none (all cached)'}")
+            stage_df = pd.DataFrame(trace.summary())
+            st.dataframe(stage_df)
+            st.download_button(
+                "Download JSON Trace",
+                json.dumps(trace.to_chrome_trace()),
+                file_name="pvsim_trace.json"
             )
 
-            with open(pdf_filename, "rb") as f:
-                st.download_button("📥 Download PDF Report", f, file_name=pdf_filename)
-
-        if st.button("Set Current as BOM B"):
-            st.session_state['bom_b_data'] = {
-                "config": {
-                    "Module": module_choice,
-                    "Inverter": inverter_choice,
-                    "Encapsulant": encapsulant,
-                    "System Size (kW)": f"{system_kw:.2f}"
-                },
-                "monthly_df": monthly_df,
-                "deg_rate": deg_rate,
-                "risk_score": risk_score,
-                "risk_label": risk_label
-            }
-            st.success("BOM B saved for comparison in next PDF export.")
+
+def show_report_export(params):
+    report_job = st.session_state.get('report_job')
+    if report_job is None:
+        if st.button("📄 Export PDF Report"):
+            # Upstream stages are cached, so this only renders the PDF
+            submit('report_job', dict(params, targets=["report"]))
+            st.rerun()
+        return
+
+    snapshot = report_job.snapshot()
+    if snapshot["status"] == "done" and snapshot["result"] is not None:
+        st.download_button("📥 Download PDF Report", snapshot["result"]["pdf_bytes"], file_name="PVSim_Report.pdf")
+    elif snapshot["status"] in ("failed", "cancelled"):
+        st.error("PDF report could not be generated.")
+        release('report_job')
+    else:
+        st.info("Rendering PDF report...")
+
+
+def show_saved_scenarios():
+    with st.expander("📂 Saved Scenarios at this Site"):
+        saved = store.find_scenarios(lat=latitude, lon=longitude)
+        if saved.empty:
+            st.write("No saved scenarios for this location yet.")
+            return
+        saved["created_at"] = pd.to_datetime(saved["created_at"], unit="s")
+        st.dataframe(saved.drop(columns=["weather_fingerprint"]))
+        if len(saved) >= 2:
+            ids = saved["id"].tolist()
+            col_a, col_b = st.columns(2)
+            id_a = col_a.selectbox("Scenario A", ids, index=1)
+            id_b = col_b.selectbox("Scenario B", ids, index=0)
+            diff = store.diff_scenarios(id_a, id_b)
+            st.dataframe(diff[diff["Changed"]].drop(columns=["Changed"]).astype(str))
+
+
+show_saved_scenarios()
+
+job = st.session_state.get('job')
+if job is None and st.session_state.get('cancelled'):
+    st.warning("Simulation cancelled.")
+if job is not None:
+    snapshot = job.snapshot()
+    status = snapshot["status"]
+
+    if status in ("queued", "running"):
+        st.progress(snapshot["progress"], text=snapshot["message"])
+        if st.button("⏹ Cancel Simulation"):
+            release('job')
+            release('report_job')
+            st.session_state['cancelled'] = True
+            st.rerun()
+
+        partial = snapshot["partial"]
+        if "weather" in partial:
+            st.write(f"✅ Weather loaded ({partial['weather']['rows']} hours)")
+        if "orientation" in partial:
+            st.write(f"✅ Using Tilt={partial['orientation']['tilt']}°, Azimuth={partial['orientation']['azimuth']}°")
+        if "monthly" in partial:
+            show_monthly(partial["monthly"])
+
+        # Poll the background job without blocking other sessions; rerun
+        # as soon as it finishes if that happens within the short wait
+        if not job.wait(timeout=0.1):
+            time.sleep(0.5)
+        st.rerun()
+    elif status == "cancelled":
+        st.warning("Simulation cancelled.")
+    elif status == "failed":
+        st.error("Simulation failed.")
+        with st.expander("Details"):
+            st.code(snapshot["error"])
+    elif snapshot["result"] is None:
+        st.error("Weather data fetch failed.")
+    else:
+        show_results(snapshot["result"], job.params)
+        report_job = st.session_state.get('report_job')
+        if report_job is not None and not report_job.finished:
+            # Keep polling while the PDF renders
+            if not report_job.wait(timeout=0.1):
+                time.sleep(0.5)
+            st.rerun()
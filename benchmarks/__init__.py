@@ -0,0 +1,3 @@
+# __init__.py
+# Benchmark suite for the PVSimApp simulation chain.
+# Run with: python -m benchmarks.run_benchmarks
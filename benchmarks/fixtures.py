@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+
+def synthetic_weather(lat=40.0, lon=-105.0, years=1, seed=0):
+    """
+    Build a seeded hourly weather frame with the PVGIS TMY columns used by utils.
+    Irradiance follows a clear-sky-like daily bell scaled by season and latitude,
+    with random cloud cover. No network access needed.
+    Returns: DataFrame with 8760 * years rows
+    """
+    rng = np.random.default_rng(seed)
+    hours = 8760 * years
+    times = pd.date_range("2019-01-01", periods=hours, freq="h", tz="UTC")
+
+    # Local solar hour from longitude, day of year for seasonality
+    solar_hour = (times.hour.values + lon / 15.0) % 24
+    day = times.dayofyear.values
+    season = np.cos(2 * np.pi * (day - 172) / 365.0)
+    if lat < 0:
+        season = -season
+
+    daylight = np.clip(np.sin((solar_hour - 6) / 12 * np.pi), 0, None)
+    peak = 1050 - 6 * abs(lat) + 150 * season
+    clouds = np.clip(rng.normal(0.75, 0.2, hours), 0.1, 1.0)
+    g_i = daylight * peak * clouds
+
+    temp = 25 - 0.35 * abs(lat) + 10 * season + 6 * daylight + rng.normal(0, 2.5, hours)
+    rh = np.clip(70 - 0.8 * (temp - 15) + rng.normal(0, 8, hours), 5, 100)
+
+    return pd.DataFrame({
+        "time": times.strftime("%Y-%m-%d %H:%M"),
+        "T2m": temp,
+        "RH": rh,
+        "G(h)": g_i * 0.85,
+        "G(i)": g_i,
+        "WS10m": rng.gamma(2.0, 1.5, hours),
+    })
+
+
+def synthetic_sites(n_sites, seed=0):
+    """
+    Return a list of (lat, lon) pairs spread over populated latitudes.
+    """
+    rng = np.random.default_rng(seed)
+    lats = rng.uniform(-45, 60, n_sites)
+    lons = rng.uniform(-180, 180, n_sites)
+    return list(zip(lats.round(2), lons.round(2)))
+
+
+def synthetic_catalog(n_modules, n_inverters, seed=0):
+    """
+    Build module and inverter tables with the columns recommend_bom expects.
+    Inverter ratings are sized around module power so pairs pass the 0.9-1.0 window.
+    Returns: (modules_df, inverters_df)
+    """
+    rng = np.random.default_rng(seed)
+    module_power = rng.integers(380, 560, n_modules)
+    modules_df = pd.DataFrame({
+        "Brand": "Synthetic",
+        "Model": [f"SYN-MOD-{i}" for i in range(n_modules)],
+        "Power (W)": module_power,
+        "Voc (V)": rng.uniform(38, 50, n_modules).round(1),
+    })
+    inverters_df = pd.DataFrame({
+        "Brand": "Synthetic",
+        "Model": [f"SYN-INV-{i}" for i in range(n_inverters)],
+        "AC Power (kW)": rng.uniform(0.4, 0.6, n_inverters).round(3),
+        "Max Input Voltage (V)": 60,
+    })
+    return modules_df, inverters_df
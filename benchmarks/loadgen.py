@@ -0,0 +1,100 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import numpy as np
+
+
+async def post(reader, writer, host, path, payload):
+    body = json.dumps(payload).encode("utf-8")
+    writer.write(
+        f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, value = line.decode("latin-1").split(":", 1)
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+def make_request(rng, sites, mix):
+    lat, lon = rng.choice(sites)
+    endpoint = rng.choices(list(mix), weights=list(mix.values()))[0]
+    if endpoint == "/simulate":
+        return endpoint, {
+            "lat": lat, "lon": lon,
+            "tilt": rng.randrange(0, 61, 5), "azimuth": rng.randrange(90, 271, 15),
+            "system_kw": round(rng.uniform(3, 12), 2), "total_loss": 0.09,
+            "cost_per_kw": 1200, "energy_price": 0.12,
+        }
+    if endpoint == "/financials":
+        return endpoint, {"system_kw": 5, "cost_per_kw": 1200, "energy_price": 0.12,
+                          "annual_kwh": round(rng.uniform(4000, 9000), 1)}
+    if endpoint == "/optimize":
+        return endpoint, {"lat": lat, "lon": lon, "system_kw": 5}
+    return endpoint, {"lat": lat, "lon": lon}
+
+
+async def client(host, port, n_requests, rng, sites, mix, latencies, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(n_requests):
+            path, payload = make_request(rng, sites, mix)
+            start = time.perf_counter()
+            status = await post(reader, writer, host, path, payload)
+            latencies.setdefault(path, []).append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    sites = [(round(rng.uniform(-40, 60), 2), round(rng.uniform(-150, 150), 2)) for _ in range(args.sites)]
+    mix = {"/simulate": args.simulate_weight, "/financials": 1, "/recommend-bom": 1, "/optimize": args.optimize_weight}
+    latencies, statuses = {}, {}
+
+    per_client = args.requests // args.concurrency
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        client(args.host, args.port, per_client, random.Random(args.seed + i), sites, mix, latencies, statuses)
+        for i in range(args.concurrency)
+    ])
+    elapsed = time.perf_counter() - start
+
+    total = sum(statuses.values())
+    print(f"{total} requests in {elapsed:.2f}s ({total / elapsed:,.1f} req/s), "
+          f"concurrency={args.concurrency}, statuses={statuses}")
+    print(f"{'endpoint':16s} {'count':>7s} {'p50 ms':>9s} {'p90 ms':>9s} {'p99 ms':>9s} {'max ms':>9s}")
+    for path, values in sorted(latencies.items()):
+        ms = np.array(values) * 1000
+        p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+        print(f"{path:16s} {len(ms):7d} {p50:9.1f} {p90:9.1f} {p99:9.1f} {ms.max():9.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load generator for sim_service.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--sites", type=int, default=4, help="Distinct sites; fewer sites means larger batches")
+    parser.add_argument("--simulate-weight", type=float, default=8)
+    parser.add_argument("--optimize-weight", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(run(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
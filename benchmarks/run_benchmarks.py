@@ -0,0 +1,263 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fixtures import synthetic_weather, synthetic_sites, synthetic_catalog
+from utils.simulation import simulate_energy_output
+from utils.optimizer import optimize_tilt_azimuth
+from utils.ai_recommender import recommend_bom
+from utils.comparison import run_multi_comparison
+from utils.report_generator import generate_pdf_report
+
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+# Stored per case: time in calibration units and peak traced memory
+BASELINE_FIELDS = ["relative", "peak_kb"]
+
+
+def calibration():
+    """
+    Fixed numpy/pandas/pure-Python workload timed in the same run as the cases.
+    Case times are divided by it so results compare across machines and load.
+    """
+    rng = np.random.default_rng(0)
+    values = rng.random(500_000)
+    keys = rng.integers(0, 12, 500_000)
+
+    def run():
+        np.sort(values)
+        pd.Series(values).groupby(keys).sum()
+        sum(i * i for i in range(100_000))
+
+    return run
+
+
+def case_simulate(years=1, n_sites=1):
+    sites = synthetic_sites(n_sites)
+    weathers = [synthetic_weather(lat, lon, years=years, seed=i) for i, (lat, lon) in enumerate(sites)]
+
+    def run():
+        for (lat, lon), weather in zip(sites, weathers):
+            simulate_energy_output(weather, lat, lon, 30, 180, 5.0)
+
+    return run, 8760 * years * n_sites
+
+
+def case_optimize(tilt_step=10, azimuth_step=30):
+    weather = synthetic_weather()
+    n_points = len(range(0, 61, tilt_step)) * len(range(90, 271, azimuth_step))
+
+    def run():
+        optimize_tilt_azimuth(weather, 40.0, -105.0, 5.0, tilt_step, azimuth_step)
+
+    return run, n_points
+
+
+def case_recommend_bom(n_modules=5, n_inverters=5):
+    weather = synthetic_weather()
+    modules_df, inverters_df = synthetic_catalog(n_modules, n_inverters)
+
+    def run():
+        recommend_bom(weather, modules_df, inverters_df)
+
+    return run, n_modules * n_inverters
+
+
+def case_comparison(n_systems=2):
+    weather = synthetic_weather()
+    configs = [{
+        "tilt": 10 * (i % 7),
+        "azimuth": 90 + 30 * (i % 7),
+        "system_size_kw": 3.0 + i,
+        "total_loss": 0.09,
+        "cost_per_kw": 1200,
+        "energy_price": 0.12,
+    } for i in range(n_systems)]
+
+    def run():
+        run_multi_comparison(weather, 40.0, -105.0, configs)
+
+    return run, n_systems
+
+
+def case_pdf_report():
+    weather = synthetic_weather()
+    monthly_df, _ = simulate_energy_output(weather, 40.0, -105.0, 30, 180, 5.0)
+
+    def run():
+        with tempfile.TemporaryDirectory(prefix="pvsim-bench-") as out_dir:
+            _render_report(os.path.join(out_dir, "report.pdf"), monthly_df)
+
+    return run, 1
+
+
+def _render_report(filename, monthly_df):
+    generate_pdf_report(
+        filename=filename,
+        config={"Latitude": 40.0, "Longitude": -105.0, "Tilt": 30, "Azimuth": 180},
+        monthly_df=monthly_df,
+        deg_rate=0.6,
+        risk_score=0.55,
+        risk_label="Medium Risk",
+        failures=["Possible yellowing/discoloration (UV + EVA)"],
+        test_plan={"Damp Heat (hours)": 1000, "UV Exposure (kWh/m²)": 15, "Thermal Cycles": 200},
+        financials={"System Cost ($)": 6000.0, "ROI (%)": 18.7},
+    )
+
+
+def build_cases(quick=False):
+    """
+    Returns: list of (name, factory) where factory() -> (run_fn, items_per_run)
+    """
+    cases = [
+        ("simulate/years=1", lambda: case_simulate(years=1)),
+        ("simulate/sites=10", lambda: case_simulate(n_sites=10)),
+        ("optimize/grid=10x30", lambda: case_optimize(10, 30)),
+        ("recommend_bom/catalog=5x5", lambda: case_recommend_bom(5, 5)),
+        ("comparison/systems=2", lambda: case_comparison(2)),
+        ("pdf_report/single", case_pdf_report),
+    ]
+    if not quick:
+        cases += [
+            ("simulate/years=10", lambda: case_simulate(years=10)),
+            ("simulate/sites=50", lambda: case_simulate(n_sites=50)),
+            ("optimize/grid=5x15", lambda: case_optimize(5, 15)),
+            ("recommend_bom/catalog=40x20", lambda: case_recommend_bom(40, 20)),
+            ("comparison/systems=50", lambda: case_comparison(50)),
+        ]
+    return cases
+
+
+def measure(run, items, repeat, calibrate):
+    """
+    Time the median of `repeat` runs after one warm-up, then record peak
+    traced memory on a separate run so tracing does not skew timings.
+    "relative" is the time in units of the calibration workload, which is
+    timed alternately with the case so both see the same machine load.
+    """
+    run()
+    calibrate()
+    timings, units = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        calibrate()
+        units.append(time.perf_counter() - start)
+    seconds = float(np.median(timings))
+    unit_seconds = float(np.median(units))
+
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "seconds": seconds,
+        "relative": seconds / unit_seconds,
+        "throughput": items / seconds if seconds else float("inf"),
+        "peak_kb": peak / 1024,
+    }
+
+
+def compare(results, baseline, time_tolerance, memory_tolerance):
+    """
+    Times are compared in calibration units, not wall seconds.
+    Returns: list of (name, status, detail) rows; status is ok, MISSING or REGRESSION.
+    """
+    rows = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None or "relative" not in base:
+            rows.append((name, "MISSING", "not in baseline; run with --update-baseline"))
+            continue
+
+        slower = result["relative"] / base["relative"] - 1 if base["relative"] else 0
+        heavier = result["peak_kb"] / base["peak_kb"] - 1 if base["peak_kb"] else 0
+        detail = f"time {slower:+.0%}, memory {heavier:+.0%}"
+        if slower > time_tolerance or heavier > memory_tolerance:
+            rows.append((name, "REGRESSION", detail))
+        else:
+            rows.append((name, "ok", detail))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the PVSimApp simulation chain.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--update-baseline", action="store_true", help="Overwrite the baseline with this run")
+    parser.add_argument("--quick", action="store_true", help="Skip the large-scale cases")
+    parser.add_argument("--only", default=None, help="Only run cases whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=9, help="Timed runs per case (median is kept)")
+    parser.add_argument("--time-tolerance", type=float, default=0.3, help="Allowed slowdown, e.g. 0.3 = +30%%")
+    parser.add_argument("--memory-tolerance", type=float, default=0.25, help="Allowed peak memory growth")
+    parser.add_argument("--output", default=None, help="Write this run's results to a JSON file")
+    args = parser.parse_args(argv)
+
+    # recommend_bom and the PDF report use paths relative to the repo root
+    os.chdir(ROOT)
+
+    calibrate = calibration()
+    results = {}
+    for name, factory in build_cases(args.quick):
+        if args.only and args.only not in name:
+            continue
+        run, items = factory()
+        results[name] = measure(run, items, args.repeat, calibrate)
+        r = results[name]
+        print(f"{name:32s} {r['seconds'] * 1000:10.1f} ms {r['relative']:8.2f} x cal "
+              f"{r['throughput']:14,.0f} items/s {r['peak_kb']:10,.0f} KiB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f).get("cases", {})
+        # Wall seconds and throughput are machine specific; keep only portable fields
+        baseline.update({
+            name: {field: result[field] for field in BASELINE_FIELDS} for name, result in results.items()
+        })
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "meta": {"python": platform.python_version(), "machine": platform.machine()},
+                "cases": baseline,
+            }, f, indent=4)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one.")
+        return 1
+
+    with open(args.baseline) as f:
+        baseline = json.load(f).get("cases", {})
+
+    rows = compare(results, baseline, args.time_tolerance, args.memory_tolerance)
+    print()
+    for name, status, detail in rows:
+        print(f"{status:10s} {name:32s} {detail}")
+
+    failures = [name for name, status, _ in rows if status != "ok"]
+    if failures:
+        print(f"\n{len(failures)} benchmark(s) regressed or missing from the baseline: {', '.join(failures)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,391 @@
+import argparse
+import asyncio
+import json
+import math
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from utils.weather import fetch_pvgis_tmy
+from utils.comparison import run_multi_comparison
+from utils.optimizer import optimize_tilt_azimuth
+from utils.ai_recommender import recommend_bom
+from utils.financials import calculate_financials
+from utils.jobs import job_key
+from utils.simulation import MOUNTS
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+# Accepted ranges for the /simulate layout fields
+LAYOUT_RANGES = {"gcr": (0.05, 0.95), "albedo": (0.0, 1.0), "max_angle": (1.0, 90.0)}
+
+
+class ServiceBusy(Exception):
+    pass
+
+
+def _site(body):
+    """
+    Returns: (lat, lon) from a request body; ValueError if either is
+    missing its valid range (which also rejects NaN and infinity)
+    """
+    lat, lon = float(body["lat"]), float(body["lon"])
+    if not -90 <= lat <= 90:
+        raise ValueError("lat must be between -90 and 90")
+    if not -180 <= lon <= 180:
+        raise ValueError("lon must be between -180 and 180")
+    return lat, lon
+
+
+def _json_safe(value):
+    """
+    JSON has no Infinity/NaN (e.g. the payback of a system that makes no
+    energy), so non-finite floats are sent as null.
+    Returns: value with non-finite floats replaced by None
+    """
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {k: _json_safe(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(v) for v in value]
+    return value
+
+
+class LRUCache:
+    def __init__(self, max_items):
+        self.max_items = max_items
+        self._items = OrderedDict()
+
+    def get(self, key):
+        if key in self._items:
+            self._items.move_to_end(key)
+            return self._items[key]
+        return None
+
+    def put(self, key, value):
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+
+class SimulationService:
+    """
+    Async JSON API over the utils models.
+    CPU work runs on a bounded thread pool and PVGIS downloads on a separate
+    I/O pool, so slow fetches never hold CPU workers; /simulate requests for the same
+    site arriving within batch_window seconds are evaluated together by
+    run_multi_comparison against one shared weather frame.
+    """
+
+    def __init__(self, workers=4, max_pending=64, batch_window=0.01, max_batch=256,
+                 cache_size=1024, weather_loader=None, io_workers=8):
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pvsim-service")
+        self.io_pool = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="pvsim-io")
+        self.max_fetches = io_workers * 4
+        self.max_pending = max_pending
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.weather_loader = weather_loader or fetch_pvgis_tmy
+        self.weather_cache = LRUCache(64)
+        self.result_cache = LRUCache(cache_size)
+        self.pending = 0
+        self._weather_inflight = {}
+        self._batches = {}
+        self.modules_df = pd.read_csv("modules.csv")
+        self.inverters_df = pd.read_csv("inverters.csv")
+        # Column names expected by recommend_bom
+        self.inverters_df["AC Power (kW)"] = self.inverters_df["Max AC Output (W)"] / 1000
+        self.inverters_df["Max Input Voltage (V)"] = self.inverters_df["Max DC Voltage (V)"]
+        self.routes = {
+            ("GET", "/health"): self.health,
+            ("POST", "/simulate"): self.simulate,
+            ("POST", "/optimize"): self.optimize,
+            ("POST", "/recommend-bom"): self.recommend_bom,
+            ("POST", "/financials"): self.financials,
+        }
+
+    async def run_cpu(self, func, *args):
+        """
+        Run func on the worker pool, rejecting work once max_pending is reached.
+        """
+        if self.pending >= self.max_pending:
+            raise ServiceBusy()
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.pool, func, *args)
+        finally:
+            self.pending -= 1
+
+    async def weather(self, lat, lon):
+        """
+        Shared weather cache; concurrent requests for one site await a single fetch.
+        New fetches are rejected with ServiceBusy once max_fetches are in flight.
+        """
+        key = (round(lat, 4), round(lon, 4))
+        cached = self.weather_cache.get(key)
+        if cached is not None:
+            return cached
+
+        if key not in self._weather_inflight:
+            if len(self._weather_inflight) >= self.max_fetches:
+                raise ServiceBusy()
+            loop = asyncio.get_running_loop()
+            self._weather_inflight[key] = loop.run_in_executor(self.io_pool, self.weather_loader, lat, lon)
+        try:
+            weather = await self._weather_inflight[key]
+        finally:
+            self._weather_inflight.pop(key, None)
+
+        if not isinstance(weather, pd.DataFrame):
+            raise ValueError(f"weather data unavailable for {lat}, {lon}")
+        self.weather_cache.put(key, weather)
+        return weather
+
+    async def cached(self, name, body, compute):
+        key = job_key({"endpoint": name, **body})
+        result = self.result_cache.get(key)
+        if result is None:
+            result = await compute()
+            self.result_cache.put(key, result)
+        return result
+
+    # --- Endpoints ---
+
+    async def health(self, body):
+        return {"status": "ok", "pending": self.pending, "fetching": len(self._weather_inflight)}
+
+    async def simulate(self, body):
+        lat, lon = _site(body)
+        config = {
+            "tilt": float(body.get("tilt", 30)),
+            "azimuth": float(body.get("azimuth", 180)),
+            "system_size_kw": float(body["system_kw"]),
+            "total_loss": float(body.get("total_loss", 0.0)),
+            "cost_per_kw": float(body.get("cost_per_kw", 0.0)),
+            "energy_price": float(body.get("energy_price", 0.0)),
+            "mount": body.get("mount", "fixed"),
+            "bifacial": body.get("bifacial", False),
+            "layout": {k: float(body[k]) for k in ("gcr", "albedo", "max_angle") if k in body},
+        }
+        # Reject bad requests here, before they join a shared batch
+        if config["mount"] not in MOUNTS:
+            raise ValueError(f"mount must be one of {MOUNTS}")
+        if not isinstance(config["bifacial"], bool):
+            raise ValueError("bifacial must be true or false")
+        for name, key in [("tilt", "tilt"), ("azimuth", "azimuth"), ("system_kw", "system_size_kw"),
+                          ("total_loss", "total_loss"), ("cost_per_kw", "cost_per_kw"),
+                          ("energy_price", "energy_price")]:
+            if not math.isfinite(config[key]):
+                raise ValueError(f"{name} must be a finite number")
+        for name, (low, high) in LAYOUT_RANGES.items():
+            value = config["layout"].get(name)
+            if value is not None and not low <= value <= high:
+                raise ValueError(f"{name} must be between {low} and {high}")
+        return await self.cached("simulate", body, lambda: self._enqueue(lat, lon, config))
+
+    async def _enqueue(self, lat, lon, config):
+        site = (round(lat, 4), round(lon, 4))
+        future = asyncio.get_running_loop().create_future()
+        if site not in self._batches:
+            # The timer is kept with the batch so an early max_batch flush can cancel it
+            timer = asyncio.get_running_loop().call_later(
+                self.batch_window, lambda: asyncio.ensure_future(self._flush(site, lat, lon))
+            )
+            self._batches[site] = ([], timer)
+        batch, _ = self._batches[site]
+        batch.append((config, future))
+        if len(batch) >= self.max_batch:
+            await self._flush(site, lat, lon)
+        return await future
+
+    async def _flush(self, site, lat, lon):
+        if site not in self._batches:
+            return
+        batch, timer = self._batches.pop(site)
+        timer.cancel()
+        configs = [config for config, _ in batch]
+        try:
+            weather = await self.weather(lat, lon)
+            results = await self._simulate_batch(weather, lat, lon, configs)
+        except ServiceBusy as e:
+            self._fail_batch(batch, e)
+            return
+        except Exception as e:
+            if self.weather_cache.get(site) is None:
+                # No weather for the site: every request in the batch fails alike
+                self._fail_batch(batch, e)
+                return
+            # One bad config must not fail the rest of the batch: retry each alone
+            for config, future in batch:
+                try:
+                    result = (await self._simulate_batch(weather, lat, lon, [config]))[0]
+                except Exception as e:
+                    self._fail_batch([(config, future)], e)
+                else:
+                    result["batch_size"] = len(batch)
+                    if not future.done():
+                        future.set_result(result)
+            return
+
+        for result, (_, future) in zip(results, batch):
+            if not future.done():
+                future.set_result(result)
+
+    @staticmethod
+    def _fail_batch(batch, error):
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    async def _simulate_batch(self, weather, lat, lon, configs):
+        energy_df, finance_df = await self.run_cpu(run_multi_comparison, weather, lat, lon, configs)
+
+        names = [f"System {i + 1}" for i in range(len(configs))]
+        monthly = {name: group for name, group in energy_df.groupby("System", sort=False)}
+        finance = {name: group for name, group in finance_df.groupby("System", sort=False)}
+        results = []
+        for name, config in zip(names, configs):
+            rows = monthly[name]
+            result = {
+                "monthly": [
+                    {"Month": int(m), "Energy (kWh)": float(e)}
+                    for m, e in zip(rows["Month"], rows["Energy (kWh)"])
+                ],
+                "annual_kwh": float(rows["Energy (kWh)"].sum()),
+                "batch_size": len(configs),
+            }
+            if config["cost_per_kw"] and config["energy_price"]:
+                result["financials"] = {
+                    metric: float(value)
+                    for metric, value in zip(finance[name]["Metric"], finance[name]["Value"])
+                }
+            results.append(result)
+        return results
+
+    async def optimize(self, body):
+        lat, lon = _site(body)
+        system_kw = float(body["system_kw"])
+
+        async def compute():
+            weather = await self.weather(lat, lon)
+            tilt, azimuth, energy = await self.run_cpu(optimize_tilt_azimuth, weather, lat, lon, system_kw)
+            return {"tilt": tilt, "azimuth": azimuth, "annual_kwh": float(energy)}
+
+        return await self.cached("optimize", body, compute)
+
+    async def recommend_bom(self, body):
+        lat, lon = _site(body)
+
+        async def compute():
+            weather = await self.weather(lat, lon)
+            candidates = await self.run_cpu(recommend_bom, weather, self.modules_df, self.inverters_df)
+            return {"candidates": candidates}
+
+        return await self.cached("recommend-bom", body, compute)
+
+    async def financials(self, body):
+        if "monthly_energy" in body:
+            energy = [float(e) for e in body["monthly_energy"]]
+        else:
+            energy = [float(body["annual_kwh"])]
+        result = calculate_financials(
+            float(body["system_kw"]), float(body["cost_per_kw"]), float(body["energy_price"]),
+            pd.DataFrame({"Energy (kWh)": energy})
+        )
+        return {k: float(v) for k, v in result.items()}
+
+    # --- HTTP plumbing ---
+
+    async def dispatch(self, method, path, body):
+        handler = self.routes.get((method, path.split("?", 1)[0]))
+        if handler is None:
+            return 404, {"error": f"no route for {method} {path}"}
+        try:
+            payload = json.loads(body) if body else {}
+            return 200, await handler(payload)
+        except ServiceBusy:
+            return 503, {"error": "server busy, retry later"}
+        except (KeyError, ValueError, TypeError) as e:
+            return 400, {"error": f"bad request: {e}"}
+        except Exception as e:
+            return 500, {"error": str(e)}
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, value = line.decode("latin-1").split(":", 1)
+                    headers[name.strip().lower()] = value.strip()
+
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                status, payload = await self.dispatch(method, path, body)
+
+                data = json.dumps(_json_safe(payload), allow_nan=False).encode("utf-8")
+                extra = "Retry-After: 1\r\n" if status == 503 else ""
+                writer.write(
+                    f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n{extra}\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"PVSimApp service listening on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local HTTP/JSON API for the PVSimApp models.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=4, help="Worker threads for CPU-heavy calls")
+    parser.add_argument("--max-pending", type=int, default=64, help="Queued CPU calls before returning 503")
+    parser.add_argument("--io-workers", type=int, default=8,
+                        help="Threads for weather downloads; 4x this many in flight before returning 503")
+    parser.add_argument("--batch-window-ms", type=float, default=10.0, help="Micro-batching window for /simulate")
+    parser.add_argument("--cache-dir", default=None, help="Keep PVGIS downloads in this directory")
+    parser.add_argument("--synthetic-weather", action="store_true", help="Use seeded offline weather (no network)")
+    args = parser.parse_args(argv)
+
+    if args.synthetic_weather:
+        from benchmarks.fixtures import synthetic_weather
+        loader = synthetic_weather
+    else:
+        loader = lambda lat, lon: fetch_pvgis_tmy(lat, lon, cache_dir=args.cache_dir)
+
+    service = SimulationService(
+        workers=args.workers,
+        max_pending=args.max_pending,
+        io_workers=args.io_workers,
+        batch_window=args.batch_window_ms / 1000,
+        weather_loader=loader,
+    )
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,10 @@
+from functools import lru_cache
+
+import numpy as np
 import pandas as pd
+from utils.profiling import profiled, arg_rows
+
+CLIMATE_ZONES = ["hot-humid", "hot-dry", "temperate", "cold"]
 
 def classify_climate_zone(temp):
     if temp > 30:
@@ -10,29 +16,51 @@ def classify_climate_zone(temp):
     else:
         return "cold"
 
+def classify_climate_zone_codes(temps):
+    """
+    Vectorized classify_climate_zone.
+    Returns: int array of indices into CLIMATE_ZONES (-1 where temp is NaN)
+    """
+    temps = np.asarray(temps, dtype=float)
+    codes = np.select(
+        [temps > 30, temps > 25, temps >= 15, np.isnan(temps)],
+        [0, 1, 2, -1],
+        default=3
+    )
+    return codes
+
+@lru_cache(maxsize=1)
+def load_failure_rates(path="data/failure_rates.csv"):
+    return pd.read_csv(path)
+
+@profiled("bom_recommender", rows=arg_rows(1))
 def recommend_bom(weather_df, modules_df, inverters_df):
     avg_temp = weather_df["T2m"].mean()
-    climate = classify_climate_zone(avg_temp)
-    failure_df = pd.read_csv("data/failure_rates.csv")
-
-    candidates = []
-    for _, mod in modules_df.iterrows():
-        for _, inv in inverters_df.iterrows():
-            mod_kw = mod["Power (W)"] / 1000
-            if 0.9 * inv["AC Power (kW)"] <= mod_kw <= inv["AC Power (kW)"]:
-                for encap in ["EVA", "POE"]:
-                    row = failure_df[
-                        (failure_df["Model"] == mod["Model"]) &
-                        (failure_df["Encapsulant"] == encap) &
-                        (failure_df["ClimateZone"] == climate)
-                    ]
-                    fail_rate = row["AvgAnnualFailureRate"].values[0] if not row.empty else 0.015
-                    score = 1 - fail_rate  # Higher score = lower failure
-                    candidates.append({
-                        "Module": mod["Model"],
-                        "Inverter": inv["Model"],
-                        "Encapsulant": encap,
-                        "Score": round(score, 3)
-                    })
-
-    return sorted(candidates, key=lambda x: x["Score"], reverse=True)[:3]
+    return recommend_bom_for_climate(classify_climate_zone(avg_temp), modules_df, inverters_df)
+
+def recommend_bom_for_climate(climate, modules_df, inverters_df):
+    """
+    Rank module/inverter/encapsulant combinations for a climate zone.
+    Returns: top 3 candidates as dicts with Module, Inverter, Encapsulant, Score
+    """
+    failure_df = load_failure_rates()
+    rates = failure_df[failure_df["ClimateZone"] == climate].drop_duplicates(["Model", "Encapsulant"])
+
+    mods = modules_df[["Model", "Power (W)"]].rename(columns={"Model": "Module"})
+    invs = inverters_df[["Model", "AC Power (kW)"]].rename(columns={"Model": "Inverter"})
+    pairs = mods.merge(invs, how="cross")
+    mod_kw = pairs["Power (W)"] / 1000
+    pairs = pairs[(0.9 * pairs["AC Power (kW)"] <= mod_kw) & (mod_kw <= pairs["AC Power (kW)"])]
+
+    candidates = pairs[["Module", "Inverter"]].merge(
+        pd.DataFrame({"Encapsulant": ["EVA", "POE"]}), how="cross"
+    )
+    candidates = candidates.merge(
+        rates[["Model", "Encapsulant", "AvgAnnualFailureRate"]],
+        left_on=["Module", "Encapsulant"], right_on=["Model", "Encapsulant"], how="left"
+    )
+    fail_rate = candidates["AvgAnnualFailureRate"].fillna(0.015)
+    candidates["Score"] = (1 - fail_rate).round(3)  # Higher score = lower failure
+
+    top = candidates.sort_values("Score", ascending=False, kind="stable").head(3)
+    return top[["Module", "Inverter", "Encapsulant", "Score"]].to_dict("records")
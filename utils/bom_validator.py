@@ -1,3 +1,6 @@
+from utils.profiling import profiled
+
+@profiled("bom_validation")
 def validate_bom(module, inverter, num_modules, location, weather_df):
     results = []
     issues = 0
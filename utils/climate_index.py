@@ -0,0 +1,242 @@
+import argparse
+import glob
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from utils.weather import summarize_weather
+from utils.ai_recommender import CLIMATE_ZONES, classify_climate_zone_codes
+
+# Per-cell statistics stored in the grid, in layer order.
+# "zone" is an index into CLIMATE_ZONES, "distance_km" is how far the cell is
+# from the cached TMY site its values came from (0 for cells with their own data).
+FIELDS = [
+    "avg_temp", "max_temp", "min_temp", "avg_rh", "avg_ghi",
+    "high_uv_hours", "high_humidity_hours", "high_irr_hours",
+    "zone", "distance_km",
+]
+EARTH_RADIUS_KM = 6371.0
+
+# Filled cells whose source site is further than this are treated as having no
+# data by the ClimateIndex queries, unless the caller passes another limit
+DEFAULT_MAX_DISTANCE_KM = 250.0
+
+
+def _unit_vectors(lats, lons):
+    lat = np.radians(lats)
+    lon = np.radians(lons)
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def cached_sites(cache_dir):
+    """
+    Yield (lat, lon, weather_df) for every TMY file written by fetch_pvgis_tmy(cache_dir=...).
+    """
+    pattern = re.compile(r"tmy_(-?\d+\.\d+)_(-?\d+\.\d+)\.csv$")
+    for path in sorted(glob.glob(os.path.join(cache_dir, "tmy_*.csv"))):
+        match = pattern.search(os.path.basename(path))
+        if match:
+            yield float(match.group(1)), float(match.group(2)), pd.read_csv(path)
+
+
+def build_climate_index(sites, path, resolution=1.0, fill=True, chunk=4096):
+    """
+    Build a global lat/lon grid of site statistics and save it under `path`.
+    sites is an iterable of (lat, lon, weather_df), e.g. cached_sites(cache_dir).
+    Sites falling in the same cell are averaged. With fill=True, empty cells
+    take the values of the nearest populated cell.
+    Returns: ClimateIndex opened on the written files
+    """
+    n_lat = int(round(180 / resolution))
+    n_lon = int(round(360 / resolution))
+    stats = FIELDS[:-2]
+
+    sums = {}
+    for lat, lon, weather_df in sites:
+        summary = summarize_weather(weather_df)
+        cell = _cell_index(lat, lon, resolution, n_lat, n_lon)
+        values = np.array([np.nan if summary[k] is None else summary[k] for k in stats])
+        total, count = sums.get(cell, (np.zeros(len(stats)), 0))
+        sums[cell] = (total + values, count + 1)
+
+    os.makedirs(path, exist_ok=True)
+    grid = np.lib.format.open_memmap(
+        os.path.join(path, "grid.npy"), mode="w+", dtype=np.float32,
+        shape=(n_lat, n_lon, len(FIELDS))
+    )
+    grid[:] = np.nan
+
+    if sums:
+        cells = np.array(list(sums.keys()))
+        values = np.array([total / count for total, count in sums.values()])
+        grid[cells[:, 0], cells[:, 1], :len(stats)] = values
+        grid[cells[:, 0], cells[:, 1], FIELDS.index("distance_km")] = 0.0
+
+        if fill:
+            _fill_nearest(grid, cells, resolution, chunk)
+
+        avg_temp = grid[:, :, FIELDS.index("avg_temp")]
+        grid[:, :, FIELDS.index("zone")] = np.where(
+            np.isnan(avg_temp), np.nan, classify_climate_zone_codes(avg_temp)
+        )
+
+    grid.flush()
+    del grid
+
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump({
+            "resolution": resolution,
+            "fields": FIELDS,
+            "zones": CLIMATE_ZONES,
+            "sites": len(sums),
+        }, f, indent=4)
+
+    return ClimateIndex(path)
+
+
+def _cell_index(lat, lon, resolution, n_lat, n_lon):
+    row = min(int((lat + 90) // resolution), n_lat - 1)
+    col = int(((lon + 180) % 360) // resolution) % n_lon
+    return row, col
+
+
+def _fill_nearest(grid, cells, resolution, chunk):
+    """
+    Copy each populated cell's statistics to every empty cell it is nearest to
+    (great-circle distance between cell centres), in row chunks to bound memory.
+    """
+    n_lat, n_lon, _ = grid.shape
+    n_stats = len(FIELDS) - 2
+    centres_lat = -90 + (np.arange(n_lat) + 0.5) * resolution
+    centres_lon = -180 + (np.arange(n_lon) + 0.5) * resolution
+
+    source_vecs = _unit_vectors(centres_lat[cells[:, 0]], centres_lon[cells[:, 1]])
+    source_vals = grid[cells[:, 0], cells[:, 1], :n_stats]
+
+    rows_per_chunk = max(1, chunk // n_lon)
+    for start in range(0, n_lat, rows_per_chunk):
+        stop = min(start + rows_per_chunk, n_lat)
+        lat_g, lon_g = np.meshgrid(centres_lat[start:stop], centres_lon, indexing="ij")
+        vecs = _unit_vectors(lat_g.ravel(), lon_g.ravel())
+        dots = vecs @ source_vecs.T
+        nearest = dots.argmax(axis=1)
+        distance = EARTH_RADIUS_KM * np.arccos(np.clip(dots[np.arange(len(nearest)), nearest], -1, 1))
+
+        block = grid[start:stop]
+        empty = np.isnan(block[:, :, FIELDS.index("distance_km")]).ravel()
+        flat = block.reshape(-1, len(FIELDS))
+        flat[empty, :n_stats] = source_vals[nearest[empty]]
+        flat[empty, FIELDS.index("distance_km")] = distance[empty]
+        grid[start:stop] = flat.reshape(block.shape)
+
+
+class ClimateIndex:
+    """
+    Memory-mapped grid of per-cell site statistics and climate zones.
+    Point lookups are a single array index, so screening needs no weather download.
+    """
+
+    def __init__(self, path):
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        self.resolution = meta["resolution"]
+        self.fields = meta["fields"]
+        self.zones = meta["zones"]
+        self.grid = np.load(os.path.join(path, "grid.npy"), mmap_mode="r")
+        self._field_index = {name: i for i, name in enumerate(self.fields)}
+
+    def cells(self, lats, lons):
+        lats = np.asarray(lats, dtype=float)
+        lons = np.asarray(lons, dtype=float)
+        n_lat, n_lon, _ = self.grid.shape
+        rows = np.clip(((lats + 90) // self.resolution).astype(int), 0, n_lat - 1)
+        cols = (((lons + 180) % 360) // self.resolution).astype(int) % n_lon
+        return rows, cols
+
+    def lookup(self, lats, lons, field, max_distance_km=DEFAULT_MAX_DISTANCE_KM, with_distance=False):
+        """
+        Vectorized lookup of one field for arrays of coordinates.
+        Cells whose source site is further than max_distance_km (None for no
+        limit) give NaN. with_distance=True also returns the distance_km array.
+        Returns: values, or (values, distance_km)
+        """
+        rows, cols = self.cells(lats, lons)
+        values = np.array(self.grid[rows, cols, self._field_index[field]])
+        distance = np.asarray(self.grid[rows, cols, self._field_index["distance_km"]])
+        values[~self._within(distance, max_distance_km)] = np.nan
+        return (values, distance) if with_distance else values
+
+    def site_summary(self, lat, lon, max_distance_km=DEFAULT_MAX_DISTANCE_KM):
+        """
+        Statistics for one point, in the summarize_weather format plus
+        climate_zone and distance_km. None if the cell has no data or its
+        source site is further than max_distance_km (None for no limit).
+        """
+        row, col = _cell_index(lat, lon, self.resolution, *self.grid.shape[:2])
+        values = self.grid[row, col]
+        if not self._within(values[self._field_index["distance_km"]], max_distance_km):
+            return None
+
+        summary = {}
+        for name, value in zip(self.fields, values):
+            summary[name] = None if np.isnan(value) else float(value)
+        summary["climate_zone"] = self.zones[int(summary.pop("zone"))]
+        return summary
+
+    def climate_zone(self, lat, lon, max_distance_km=DEFAULT_MAX_DISTANCE_KM):
+        summary = self.site_summary(lat, lon, max_distance_km)
+        return summary["climate_zone"] if summary else None
+
+    def region(self, lat_min, lat_max, lon_min, lon_max, fields=None, max_distance_km=DEFAULT_MAX_DISTANCE_KM):
+        """
+        Cell centres and field arrays for a lat/lon box, for regional heatmaps.
+        Cells further than max_distance_km from their source site are NaN;
+        distance_km is always included so callers can see how local each cell is.
+        lon_min > lon_max selects a box crossing the antimeridian; its lons
+        then continue past 180 so they stay increasing.
+        Returns: (lats, lons, {field: 2-D array})
+        """
+        n_lat, n_lon, _ = self.grid.shape
+        r0, c0 = _cell_index(lat_min, lon_min, self.resolution, n_lat, n_lon)
+        r1, _ = _cell_index(lat_max, lon_max, self.resolution, n_lat, n_lon)
+        span = lon_max - lon_min if lon_max >= lon_min else lon_max - lon_min + 360
+        c1 = min(int(((lon_min + 180) % 360 + span) // self.resolution), c0 + n_lon - 1)
+        cols = np.arange(c0, c1 + 1)
+        lats = -90 + (np.arange(r0, r1 + 1) + 0.5) * self.resolution
+        lons = -180 + (cols + 0.5) * self.resolution
+        if c1 < n_lon:
+            block = self.grid[r0:r1 + 1, c0:c1 + 1]
+        else:
+            block = self.grid[r0:r1 + 1][:, cols % n_lon]
+        distance = np.array(block[:, :, self._field_index["distance_km"]])
+        far = ~self._within(distance, max_distance_km)
+
+        arrays = {}
+        for name in dict.fromkeys(list(fields or self.fields) + ["distance_km"]):
+            values = np.array(block[:, :, self._field_index[name]])
+            if name != "distance_km":
+                values[far] = np.nan
+            arrays[name] = values
+        return lats, lons, arrays
+
+    @staticmethod
+    def _within(distance, max_distance_km):
+        with np.errstate(invalid="ignore"):
+            if max_distance_km is None:
+                return ~np.isnan(distance)
+            return distance <= max_distance_km
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the climate-zone grid index from cached TMY files.")
+    parser.add_argument("cache_dir", help="Directory of tmy_<lat>_<lon>.csv files (fetch_pvgis_tmy cache_dir)")
+    parser.add_argument("out_dir", help="Directory to write grid.npy and meta.json")
+    parser.add_argument("--resolution", type=float, default=1.0, help="Cell size in degrees")
+    parser.add_argument("--no-fill", action="store_true", help="Leave cells without a cached site empty")
+    args = parser.parse_args()
+
+    index = build_climate_index(cached_sites(args.cache_dir), args.out_dir, args.resolution, fill=not args.no_fill)
+    print(f"Wrote {args.out_dir} ({index.grid.shape[0]}x{index.grid.shape[1]} cells)")
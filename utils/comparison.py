@@ -1,29 +1,113 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
 from utils.simulation import simulate_energy_output
 from utils.financials import calculate_financials
+from utils.profiling import profiled
+from utils.shared_weather import map_shared
 
-def run_comparison(weather_df, lat, lon, config1, config2):
-    # Simulate system 1
-    energy1, _ = simulate_energy_output(
-        weather_df, lat, lon,
-        config1['tilt'], config1['azimuth'], config1['system_size_kw']
-    )
-    energy1["Energy (kWh)"] *= (1 - config1['total_loss'])
 
-    # Simulate system 2
-    energy2, _ = simulate_energy_output(
-        weather_df, lat, lon,
-        config2['tilt'], config2['azimuth'], config2['system_size_kw']
-    )
-    energy2["Energy (kWh)"] *= (1 - config2['total_loss'])
+def _profile_key(config):
+    layout = tuple(sorted((config.get('layout') or {}).items()))
+    return (config['tilt'], config['azimuth'], config.get('mount', "fixed"), config.get('bifacial', False), layout)
+
+
+def _monthly_per_kw(weather, lat, lon, key):
+    tilt, azimuth, mount, bifacial, layout = key
+    monthly, _ = simulate_energy_output(weather, lat, lon, tilt, azimuth, 1.0,
+                                        mount=mount, bifacial=bifacial, layout=dict(layout))
+    return monthly
+
+
+def simulate_per_kw(weather_df, lat, lon, configs, max_workers=None, processes=None):
+    """
+    Simulate one 1 kW array per unique orientation/mount/layout in configs.
+    The energy model is linear in system size, so every config sharing an
+    orientation reuses the same monthly profile.
+    processes > 1 runs the profiles in worker processes over shared-memory
+    weather; otherwise max_workers threads are used.
+    Returns: dict of (tilt, azimuth, mount, bifacial, layout items) -> monthly DataFrame for 1 kW
+    """
+    keys = list(dict.fromkeys(_profile_key(c) for c in configs))
+
+    if processes and processes > 1 and len(keys) > 1:
+        results = map_shared(_monthly_per_kw, weather_df, [(lat, lon, key) for key in keys], processes)
+        return dict(zip(keys, results))
+
+    def run(key):
+        return _monthly_per_kw(weather_df, lat, lon, key)
+
+    if max_workers and len(keys) > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            # Copy the context per task so worker-thread calls join the active trace
+            futures = [pool.submit(contextvars.copy_context().run, run, key) for key in keys]
+            return {key: future.result() for key, future in zip(keys, futures)}
+    return {key: run(key) for key in keys}
 
-    # Financials
-    finance1 = calculate_financials(
-        config1['system_size_kw'], config1['cost_per_kw'],
-        config1['energy_price'], energy1
+
+@profiled("comparison")
+def run_multi_comparison(weather_df, lat, lon, configs, names=None, max_workers=None, processes=None):
+    """
+    Compare any number of system configs against one weather load.
+    Each config needs tilt, azimuth, system_size_kw, total_loss,
+    cost_per_kw and energy_price, and may set mount, bifacial and layout
+    (see simulate_energy_output).
+    Orientations are simulated once each, optionally across max_workers
+    threads or processes worker processes.
+    names, if given, must hold one unique name per config (ValueError otherwise).
+    Returns: (energy_df, finance_df) in long format, one row per
+    system/month and one row per system/metric.
+    """
+    if names is None:
+        names = [f"System {i + 1}" for i in range(len(configs))]
+    names = list(names)
+    if len(names) != len(configs) or len(set(names)) != len(configs):
+        raise ValueError("names must give one unique name per config")
+
+    per_kw = simulate_per_kw(weather_df, lat, lon, configs, max_workers, processes)
+
+    profile_ids = {key: i for i, key in enumerate(per_kw)}
+    configs_df = pd.DataFrame({
+        "System": names,
+        "Profile": [profile_ids[_profile_key(c)] for c in configs],
+        "Scale": [c['system_size_kw'] * (1 - c['total_loss']) for c in configs],
+    })
+
+    profiles = pd.concat(
+        [df.assign(Profile=profile_ids[key]) for key, df in per_kw.items()],
+        ignore_index=True
     )
-    finance2 = calculate_financials(
-        config2['system_size_kw'], config2['cost_per_kw'],
-        config2['energy_price'], energy2
+
+    energy_df = configs_df.merge(profiles, on="Profile", how="left", sort=False)
+    energy_df["Energy (kWh)"] *= energy_df["Scale"]
+    energy_df = energy_df[["System", "Month", "Energy (kWh)"]].reset_index(drop=True)
+
+    annual = energy_df.groupby("System", sort=False)["Energy (kWh)"].sum()
+    finance_rows = []
+    for name, config in zip(names, configs):
+        finance = calculate_financials(
+            config['system_size_kw'], config['cost_per_kw'],
+            config['energy_price'],
+            pd.DataFrame({"Energy (kWh)": [annual[name]]})
+        )
+        for metric, value in finance.items():
+            finance_rows.append({"System": name, "Metric": metric, "Value": value})
+
+    return energy_df, pd.DataFrame(finance_rows)
+
+
+def run_comparison(weather_df, lat, lon, config1, config2):
+    energy_df, finance_df = run_multi_comparison(
+        weather_df, lat, lon, [config1, config2], names=["System 1", "System 2"]
     )
 
+    def unpack(name):
+        energy = energy_df[energy_df["System"] == name][["Month", "Energy (kWh)"]]
+        finance = finance_df[finance_df["System"] == name]
+        return energy.reset_index(drop=True), dict(zip(finance["Metric"], finance["Value"]))
+
+    energy1, finance1 = unpack("System 1")
+    energy2, finance2 = unpack("System 2")
     return energy1, energy2, finance1, finance2
@@ -1,5 +1,6 @@
 import numpy as np
 import pandas as pd
+from utils.profiling import profiled, arg_rows
 
 def arrhenius_acceleration(temp_c, ea=0.7):
     k = 8.617e-5  # Boltzmann constant in eV/K
@@ -7,6 +8,7 @@ def arrhenius_acceleration(temp_c, ea=0.7):
     t_actual = temp_c + 273.15  # convert °C to Kelvin
     return np.exp((ea / k) * ((1 / t_ref) - (1 / t_actual)))
 
+@profiled("degradation", rows=arg_rows(0))
 def estimate_annual_degradation(temp_series, base_deg=0.5):
     """
     Use Arrhenius model to adjust base degradation (e.g. 0.5%/year) based on temp stress.
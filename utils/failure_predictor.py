@@ -1,29 +1,83 @@
+import numpy as np
+from utils.profiling import profiled, arg_rows
+from utils.weather import summarize_weather
+
+# Columns of failure_flag_matrix, in the order predict_failure_modes lists them
+FAILURE_MODES = [
+    "🔴 Risk of PID (high temp + EVA)",
+    "🟡 Possible yellowing/discoloration (UV + EVA)",
+    "🔴 Corrosion/delamination risk (humid + EVA)",
+    "✅ POE: better resistance to PID, UV, corrosion",
+    "🟡 High thermal cycling range — check solder bond durability",
+    "✅ No major failure risks detected.",
+]
+
+@profiled("failure_rules", rows=arg_rows(1))
 def predict_failure_modes(module, weather_df, encapsulant="EVA"):
-    temp = weather_df["T2m"]
-    irr = weather_df["G(i)"]
-    rh = weather_df["RH"]
+    return predict_failure_modes_from_summary(summarize_weather(weather_df), encapsulant)
 
-    avg_temp = temp.mean()
-    max_temp = temp.max()
-    high_uv_days = (irr > 900).sum()
-    high_humidity_days = (rh > 75).sum()
+def predict_failure_modes_from_summary(summary, encapsulant="EVA"):
+    """
+    Same rules as predict_failure_modes on a precomputed site summary
+    (see utils.weather.summarize_weather / utils.climate_index).
+    Rules whose statistic is None (no RH or G(i) data) are skipped.
+    """
+    avg_temp = summary["avg_temp"]
+    max_temp = summary["max_temp"]
+    high_uv_days = summary["high_uv_hours"]
+    high_humidity_days = summary["high_humidity_hours"]
 
     failures = []
 
     if encapsulant == "EVA":
         if avg_temp > 35 or max_temp > 55:
-            failures.append("🔴 Risk of PID (high temp + EVA)")
-        if high_uv_days > 30:
-            failures.append("🟡 Possible yellowing/discoloration (UV + EVA)")
-        if high_humidity_days > 40:
-            failures.append("🔴 Corrosion/delamination risk (humid + EVA)")
+            failures.append(FAILURE_MODES[0])
+        if high_uv_days is not None and high_uv_days > 30:
+            failures.append(FAILURE_MODES[1])
+        if high_humidity_days is not None and high_humidity_days > 40:
+            failures.append(FAILURE_MODES[2])
     elif encapsulant == "POE":
-        failures.append("✅ POE: better resistance to PID, UV, corrosion")
+        failures.append(FAILURE_MODES[3])
 
-    if max_temp - temp.min() > 50:
-        failures.append("🟡 High thermal cycling range — check solder bond durability")
+    if max_temp - summary["min_temp"] > 50:
+        failures.append(FAILURE_MODES[4])
 
     if not failures:
-        failures.append("✅ No major failure risks detected.")
+        failures.append(FAILURE_MODES[5])
 
     return failures
+
+def failure_flag_matrix(avg_temp, max_temp, min_temp, high_uv_hours, high_humidity_hours, encapsulant):
+    """
+    Vectorized predict_failure_modes_from_summary. Site statistics and the
+    encapsulant ("EVA"/"POE" strings) broadcast against each other, e.g.
+    site arrays of shape (n_sites, 1) with encapsulants of shape (n_boms,).
+    As in the scalar rules, a NaN statistic never triggers its rule.
+    Returns: bool array of shape broadcast_shape + (len(FAILURE_MODES),)
+    """
+    avg_temp, max_temp, min_temp, high_uv, high_rh, encapsulant = np.broadcast_arrays(
+        np.asarray(avg_temp, dtype=float), np.asarray(max_temp, dtype=float),
+        np.asarray(min_temp, dtype=float), np.asarray(high_uv_hours, dtype=float),
+        np.asarray(high_humidity_hours, dtype=float), np.asarray(encapsulant)
+    )
+    is_eva = encapsulant == "EVA"
+
+    flags = np.zeros(avg_temp.shape + (len(FAILURE_MODES),), dtype=bool)
+    flags[..., 0] = is_eva & ((avg_temp > 35) | (max_temp > 55))
+    flags[..., 1] = is_eva & (high_uv > 30)
+    flags[..., 2] = is_eva & (high_rh > 40)
+    flags[..., 3] = encapsulant == "POE"
+    flags[..., 4] = max_temp - min_temp > 50
+    flags[..., 5] = ~flags[..., :5].any(axis=-1)
+    return flags
+
+def render_failure_modes(flags):
+    """
+    Turn failure_flag_matrix rows back into predict_failure_modes-style lists.
+    Returns: nested lists matching the leading shape of flags
+    """
+    modes = np.asarray(FAILURE_MODES, dtype=object)
+    flags = np.asarray(flags, dtype=bool)
+    if flags.ndim == 1:
+        return list(modes[flags])
+    return [render_failure_modes(row) for row in flags]
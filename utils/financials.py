@@ -1,3 +1,6 @@
+from utils.profiling import profiled
+
+@profiled("financials")
 def calculate_financials(system_size_kw, cost_per_kw, energy_price, monthly_energy_df):
     """
     Calculate system cost, annual savings, payback period, and ROI.
@@ -0,0 +1,269 @@
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+SOLAR_CONSTANT = 1367.0
+
+# Signed row rotation grid (degrees) the view factors are precomputed on
+ROTATION_GRID = np.arange(-90, 91)
+
+DEFAULT_LAYOUT = {
+    "gcr": 0.35,          # collector width / row pitch
+    "height": 1.0,        # height of the row centre above ground, in collector widths
+    "albedo": 0.25,
+    "bifaciality": 0.7,   # rear / front efficiency ratio
+    "max_angle": 60.0,    # tracker rotation limit (degrees)
+    "backtrack": True,
+}
+
+
+def layout_with_defaults(layout=None):
+    return {**DEFAULT_LAYOUT, **(layout or {})}
+
+
+def solar_position(times, lat, lon):
+    """
+    Approximate solar position (Spencer declination and equation of time),
+    vectorized over a UTC datetime Series/Index.
+    Returns: (zenith, azimuth) arrays in degrees, azimuth clockwise from north
+    """
+    times = pd.DatetimeIndex(times)
+    day_angle = 2 * np.pi * (times.dayofyear.values - 1) / 365.0
+    decl = (0.006918 - 0.399912 * np.cos(day_angle) + 0.070257 * np.sin(day_angle)
+            - 0.006758 * np.cos(2 * day_angle) + 0.000907 * np.sin(2 * day_angle)
+            - 0.002697 * np.cos(3 * day_angle) + 0.00148 * np.sin(3 * day_angle))
+    eot = 229.18 * (0.000075 + 0.001868 * np.cos(day_angle) - 0.032077 * np.sin(day_angle)
+                    - 0.014615 * np.cos(2 * day_angle) - 0.040849 * np.sin(2 * day_angle))
+
+    utc_minutes = times.hour.values * 60 + times.minute.values
+    solar_minutes = utc_minutes + eot + 4 * lon
+    hour_angle = np.radians(solar_minutes / 4.0 - 180)
+
+    phi = np.radians(lat)
+    cos_zen = np.sin(phi) * np.sin(decl) + np.cos(phi) * np.cos(decl) * np.cos(hour_angle)
+    zenith = np.degrees(np.arccos(np.clip(cos_zen, -1, 1)))
+
+    # East/north/up components of the sun vector give the azimuth directly
+    east = -np.cos(decl) * np.sin(hour_angle)
+    north = np.cos(phi) * np.sin(decl) - np.sin(phi) * np.cos(decl) * np.cos(hour_angle)
+    azimuth = np.degrees(np.arctan2(east, north)) % 360
+    return zenith, azimuth
+
+
+def split_irradiance(weather_df, zenith, day_of_year):
+    """
+    Beam-normal and diffuse-horizontal irradiance. Uses the PVGIS Gb(n)/Gd(h)
+    columns when present, otherwise splits G(h) with the Erbs correlation.
+    Returns: (ghi, dni, dhi) arrays in W/m²
+    """
+    ghi = np.asarray(weather_df["G(h)"], dtype=float)
+    cos_zen = np.cos(np.radians(zenith))
+    if "Gb(n)" in weather_df.columns and "Gd(h)" in weather_df.columns:
+        return ghi, np.asarray(weather_df["Gb(n)"], dtype=float), np.asarray(weather_df["Gd(h)"], dtype=float)
+
+    extra = SOLAR_CONSTANT * (1 + 0.033 * np.cos(2 * np.pi * day_of_year / 365.0))
+    kt = np.clip(ghi / (extra * np.maximum(cos_zen, 0.065)), 0, 1)
+    diffuse_fraction = np.select(
+        [kt <= 0.22, kt <= 0.8],
+        [1 - 0.09 * kt, 0.9511 - 0.1604 * kt + 4.388 * kt ** 2 - 16.638 * kt ** 3 + 12.336 * kt ** 4],
+        0.165,
+    )
+    dhi = ghi * diffuse_fraction
+    dni = np.where(zenith < 87, (ghi - dhi) / np.maximum(cos_zen, 0.065), 0.0)
+    return ghi, dni, dhi
+
+
+def tracker_rotation(zenith, azimuth, axis_azimuth=180, max_angle=60, backtrack=True, gcr=0.35):
+    """
+    Rotation of a horizontal single-axis tracker, with optional backtracking so
+    rows never shade each other. Positive angles face axis_azimuth + 90°.
+    Rows are stowed flat at night.
+    Returns: array of rotation angles in degrees
+    """
+    zen = np.radians(zenith)
+    x = np.sin(zen) * np.sin(np.radians(azimuth - axis_azimuth))
+    z = np.cos(zen)
+    ideal = np.degrees(np.arctan2(x, z))
+    # Keep the rotation in (-90, 90): past the horizon the sun is behind the axis
+    ideal = np.where(ideal > 90, ideal - 180, np.where(ideal < -90, ideal + 180, ideal))
+
+    rotation = ideal
+    if backtrack:
+        temp = np.abs(np.cos(np.radians(ideal))) / gcr
+        correction = np.degrees(np.arccos(np.minimum(temp, 1.0)))
+        rotation = ideal - np.sign(ideal) * correction
+
+    rotation = np.clip(rotation, -max_angle, max_angle)
+    return np.where(zenith < 90, rotation, 0.0)
+
+
+def surface_orientation(rotation, axis_azimuth):
+    """
+    Returns: (surface_tilt, surface_azimuth) in degrees for signed row rotations
+    """
+    surface_azimuth = (axis_azimuth + np.where(rotation >= 0, 90, -90)) % 360
+    return np.abs(rotation), surface_azimuth
+
+
+def cos_incidence(zenith, azimuth, surface_tilt, surface_azimuth):
+    zen, tilt = np.radians(zenith), np.radians(surface_tilt)
+    return (np.cos(zen) * np.cos(tilt)
+            + np.sin(zen) * np.sin(tilt) * np.cos(np.radians(azimuth - surface_azimuth)))
+
+
+def row_shaded_fraction(rotation, zenith, azimuth, axis_azimuth, gcr):
+    """
+    Fraction of each row's width in the beam shadow of the row in front.
+    Zero whenever the rows are backtracking.
+    Returns: array in [0, 1]
+    """
+    zen = np.radians(zenith)
+    across = np.sin(zen) * np.cos(np.radians(azimuth - axis_azimuth - 90))
+    projected = np.arctan2(across, np.cos(zen))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        shaded = 1 - np.cos(projected) / (gcr * np.cos(projected - np.radians(rotation)))
+    return np.where(zenith < 90, np.clip(np.nan_to_num(shaded), 0, 1), 0.0)
+
+
+def poa_front(zenith, azimuth, surface_tilt, surface_azimuth, ghi, dni, dhi, albedo, shaded_fraction=0.0):
+    """
+    Isotropic-sky plane-of-array irradiance on the front surface; beam is
+    reduced by shaded_fraction for inter-row shading.
+    Returns: array in W/m²
+    """
+    cos_aoi = cos_incidence(zenith, azimuth, surface_tilt, surface_azimuth)
+    cos_tilt = np.cos(np.radians(surface_tilt))
+    beam = dni * np.clip(cos_aoi, 0, None) * (zenith < 90) * (1 - shaded_fraction)
+    return beam + dhi * (1 + cos_tilt) / 2 + ghi * albedo * (1 - cos_tilt) / 2
+
+
+# --- Row geometry (2D cross-section perpendicular to the row axis) ---
+#
+# Units are collector widths: each row is a unit-width segment centred at
+# (k * pitch, height), rotated by beta, with front normal (sin beta, cos beta).
+# The ground over one pitch is split into n_bins strips so shading can vary by hour.
+
+def _ray_hits(origins, directions, pitch, height, beta, n_neighbours):
+    """
+    Cast rays from origins (..., 2) along directions (..., 2) through an infinite
+    row field. Returns: (hit_sky, ground_x) where ground_x is NaN unless the ray
+    reaches the ground first.
+    """
+    tangent = np.array([np.cos(beta), -np.sin(beta)])
+    nearest = np.full(origins.shape[:-1], np.inf)
+    for k in range(-n_neighbours, n_neighbours + 1):
+        # Solve origin + t * d = centre + s * tangent
+        centre = np.array([k * pitch, height])
+        det = directions[..., 0] * -tangent[1] + directions[..., 1] * tangent[0]
+        rel = centre - origins
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = (rel[..., 0] * -tangent[1] + rel[..., 1] * tangent[0]) / det
+            s = (directions[..., 0] * rel[..., 1] - directions[..., 1] * rel[..., 0]) / det
+        hit = (np.abs(det) > 1e-12) & (t > 1e-9) & (np.abs(s) <= 0.5)
+        nearest = np.where(hit & (t < nearest), t, nearest)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t_ground = np.where(directions[..., 1] < 0, -origins[..., 1] / directions[..., 1], np.inf)
+    to_ground = t_ground < nearest
+    ground_x = np.where(to_ground, origins[..., 0] + t_ground * directions[..., 0], np.nan)
+    hit_sky = np.isinf(nearest) & (directions[..., 1] > 0)
+    return hit_sky, ground_x
+
+
+def _hemisphere(normal_angle, n_rays):
+    # Uniform in sin(theta) gives equal cosine-weighted 2D view-factor weights
+    sin_theta = (np.arange(n_rays) + 0.5) / n_rays * 2 - 1
+    angle = normal_angle + np.arcsin(sin_theta)
+    return np.stack([np.sin(angle), np.cos(angle)], axis=-1)
+
+
+@lru_cache(maxsize=32)
+def row_view_factors(gcr, height, n_bins=40, n_points=12, n_rays=240, n_neighbours=4):
+    """
+    Precompute, for every rotation in ROTATION_GRID, the rear-surface view
+    factors to the sky and to each ground strip, and each ground strip's view
+    factor to the sky. Cached per layout, so hourly series and scenario sweeps
+    only index into it.
+    Returns: dict of arrays rear_sky (R,), rear_ground (R, n_bins),
+    ground_sky (R, n_bins) and bin_centres (n_bins,)
+    """
+    pitch = 1.0 / gcr
+    bin_centres = (np.arange(n_bins) + 0.5) / n_bins * pitch
+    rear_sky = np.zeros(len(ROTATION_GRID))
+    rear_ground = np.zeros((len(ROTATION_GRID), n_bins))
+    ground_sky = np.zeros((len(ROTATION_GRID), n_bins))
+
+    along = (np.arange(n_points) + 0.5) / n_points - 0.5
+    weight = 1.0 / (n_points * n_rays)
+    for i, rotation in enumerate(ROTATION_GRID):
+        beta = np.radians(rotation)
+        tangent = np.array([np.cos(beta), -np.sin(beta)])
+        rear_normal = np.array([-np.sin(beta), -np.cos(beta)])
+
+        # Start rays just behind the rear surface so they clear their own row
+        points = np.array([0.0, height]) + along[:, None] * tangent + 1e-6 * rear_normal
+        rays = _hemisphere(beta + np.pi, n_rays)
+        origins = np.broadcast_to(points[:, None, :], (n_points, n_rays, 2))
+        directions = np.broadcast_to(rays[None, :, :], (n_points, n_rays, 2))
+        hit_sky, ground_x = _ray_hits(origins, directions, pitch, height, beta, n_neighbours)
+        rear_sky[i] = hit_sky.sum() * weight
+        landed = ~np.isnan(ground_x)
+        strips = (np.mod(ground_x[landed], pitch) / pitch * n_bins).astype(int) % n_bins
+        rear_ground[i] = np.bincount(strips, minlength=n_bins) * weight
+
+        origins = np.stack([bin_centres, np.zeros(n_bins)], axis=-1)[:, None, :]
+        directions = _hemisphere(0.0, n_rays)[None, :, :]
+        hit_sky, _ = _ray_hits(np.broadcast_to(origins, (n_bins, n_rays, 2)),
+                               np.broadcast_to(directions, (n_bins, n_rays, 2)),
+                               pitch, height, beta, n_neighbours)
+        ground_sky[i] = hit_sky.mean(axis=1)
+
+    return {"rear_sky": rear_sky, "rear_ground": rear_ground, "ground_sky": ground_sky,
+            "bin_centres": bin_centres}
+
+
+def ground_shading(rotation, zenith, azimuth, axis_azimuth, gcr, height, bin_centres):
+    """
+    Which ground strips lie in a row shadow, for each hour.
+    Returns: bool array (hours, n_bins)
+    """
+    pitch = 1.0 / gcr
+    beta = np.radians(rotation)[:, None]
+    zen = np.radians(zenith)[:, None]
+    # Sun direction projected into the cross-section plane
+    across = np.sin(zen) * np.cos(np.radians(azimuth - axis_azimuth - 90))[:, None]
+    up = np.maximum(np.cos(zen), 1e-3)
+
+    edges = np.array([-0.5, 0.5])[None, :]
+    edge_x = edges * np.cos(beta)
+    edge_y = height - edges * np.sin(beta)
+    shadow_x = edge_x - edge_y * across / up
+    start = shadow_x.min(axis=1, keepdims=True)
+    width = np.minimum(shadow_x.max(axis=1, keepdims=True) - start, pitch)
+
+    shaded = np.mod(bin_centres[None, :] - start, pitch) < width
+    return shaded & (zenith < 90)[:, None]
+
+
+def rear_irradiance(rotation, zenith, azimuth, axis_azimuth, ghi, dni, dhi, layout):
+    """
+    View-factor rear irradiance for an infinite row field, vectorized over hours.
+    Ground strips in a row shadow only receive sky diffuse; row self-shading of
+    the rear surface by mounting structures is not modelled.
+    Returns: array in W/m²
+    """
+    factors = row_view_factors(round(layout["gcr"], 4), round(layout["height"], 4))
+    index = np.clip(np.round(rotation).astype(int) - ROTATION_GRID[0], 0, len(ROTATION_GRID) - 1)
+
+    shaded = ground_shading(rotation, zenith, azimuth, axis_azimuth,
+                            layout["gcr"], layout["height"], factors["bin_centres"])
+    beam_horizontal = (dni * np.clip(np.cos(np.radians(zenith)), 0, None))[:, None]
+    ground = np.where(shaded, 0.0, beam_horizontal) + dhi[:, None] * factors["ground_sky"][index]
+    reflected = layout["albedo"] * np.einsum("hb,hb->h", factors["rear_ground"][index], ground)
+
+    # Beam reaches the rear surface when the sun is behind the row
+    tilt, surface_azimuth = surface_orientation(rotation, axis_azimuth)
+    cos_aoi = cos_incidence(zenith, azimuth, tilt, surface_azimuth)
+    beam = dni * np.clip(-cos_aoi, 0, None) * (zenith < 90)
+    return beam + dhi * factors["rear_sky"][index] + reflected
@@ -0,0 +1,175 @@
+import contextvars
+import hashlib
+import json
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def job_key(params):
+    """
+    Stable hash of job parameters, used to deduplicate identical runs.
+    """
+    payload = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class Job:
+    """
+    One background pipeline run. The worker publishes partial results with
+    report(); the UI polls snapshot() and may cancel().
+    """
+
+    def __init__(self, key, params):
+        self.key = key
+        self.params = params
+        self.status = "queued"
+        self.progress = 0.0
+        self.message = "Queued"
+        self.partial = {}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.subscribers = set()
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed", "cancelled")
+
+    def report(self, stage, payload=None, progress=None, message=None):
+        """
+        Publish a partial result from the worker; also the cancellation point.
+        """
+        self.check_cancelled()
+        with self._lock:
+            if payload is not None:
+                self.partial[stage] = payload
+            if progress is not None:
+                self.progress = progress
+            self.message = message or stage
+
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def wait(self, timeout=None):
+        """
+        Block until the job finishes or timeout seconds pass.
+        Returns: True if the job has finished
+        """
+        return self._done.wait(timeout)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "status": self.status,
+                "progress": self.progress,
+                "message": self.message,
+                "partial": dict(self.partial),
+                "result": self.result,
+                "error": self.error,
+            }
+
+
+class JobRegistry:
+    """
+    Process-wide registry of background jobs backed by a thread pool.
+    Submitting parameters identical to a live or successfully finished job
+    attaches to it instead of starting a second run, so repeat clicks and
+    other sessions share one computation.
+    """
+
+    def __init__(self, max_workers=4, keep_seconds=600):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pvsim-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self.keep_seconds = keep_seconds
+
+    def submit(self, func, params, subscriber=None):
+        """
+        Run func(params, job) in the pool, or attach to an identical job.
+        subscriber identifies the caller (e.g. session and slot) so release()
+        only ever drops that caller's interest; a unique one is made if omitted.
+        Returns: Job
+        """
+        key = job_key(params)
+        with self._lock:
+            self._prune()
+            job = self._jobs.get(key)
+            if job is None or not self._reusable(job):
+                job = Job(key, params)
+                self._jobs[key] = job
+                context = contextvars.copy_context()
+                self._pool.submit(context.run, self._run, job, func)
+            job.subscribers.add(subscriber or uuid.uuid4().hex)
+        return job
+
+    @staticmethod
+    def _reusable(job):
+        # Jobs being cancelled, failed ones and runs that produced nothing
+        # (e.g. a weather fetch that failed) are retried rather than shared
+        if job._cancel.is_set() or job.status in ("failed", "cancelled"):
+            return False
+        return not (job.status == "done" and job.result is None)
+
+    def get(self, key):
+        with self._lock:
+            return self._jobs.get(key)
+
+    def release(self, job, subscriber):
+        """
+        Detach a subscriber (releasing twice is a no-op); the job is cancelled
+        when nobody is waiting on it.
+        """
+        with self._lock:
+            if subscriber not in job.subscribers:
+                return
+            job.subscribers.discard(subscriber)
+            if not job.subscribers and not job.finished:
+                job.cancel()
+
+    def _run(self, job, func):
+        if job._cancel.is_set():
+            self._finish(job, "cancelled")
+            return
+        job.status = "running"
+        try:
+            result = func(job.params, job)
+        except JobCancelled:
+            self._finish(job, "cancelled")
+        except Exception as e:
+            job.error = f"{e}\n{traceback.format_exc()}"
+            self._finish(job, "failed")
+        else:
+            job.result = result
+            job.progress = 1.0
+            self._finish(job, "done")
+
+    def _finish(self, job, status):
+        with job._lock:
+            job.status = status
+            job.message = status.capitalize()
+            job.finished_at = time.time()
+        job._done.set()
+
+    def _prune(self):
+        now = time.time()
+        expired = [
+            key for key, job in self._jobs.items()
+            if job.finished and now - job.finished_at > self.keep_seconds
+        ]
+        for key in expired:
+            del self._jobs[key]
@@ -1,24 +1,73 @@
 import numpy as np
+import pandas as pd
 from utils.simulation import simulate_energy_output
+from utils.profiling import profiled
+from utils.shared_weather import shared_view, map_shared
 
-def optimize_tilt_azimuth(weather_df, lat, lon, system_size_kw):
+def _annual_energy(weather, lat, lon, tilt, azimuth, system_size_kw):
+    monthly_energy, _ = simulate_energy_output(weather, lat, lon, tilt, azimuth, system_size_kw)
+    return monthly_energy["Energy (kWh)"].sum()
+
+
+@profiled("optimizer")
+def optimize_tilt_azimuth(weather_df, lat, lon, system_size_kw, tilt_step=10, azimuth_step=30, progress=None,
+                          processes=None):
     """
     Try combinations of tilt and azimuth, return the best-performing pair.
+    tilt_step/azimuth_step set the grid resolution in degrees.
+    progress(done, total) is called after each grid point; raising from it stops the search.
+    processes > 1 spreads the grid over worker processes that share one
+    copy of the weather (see utils.shared_weather).
     """
     best_energy = 0
     best_tilt = 0
     best_azimuth = 180
 
-    for tilt in range(0, 61, 10):
-        for azimuth in range(90, 271, 30):
-            monthly_energy, _ = simulate_energy_output(
-                weather_df, lat, lon, tilt, azimuth, system_size_kw
-            )
-            total_energy = monthly_energy["Energy (kWh)"].sum()
+    grid = [(tilt, azimuth) for tilt in range(0, 61, tilt_step) for azimuth in range(90, 271, azimuth_step)]
 
-            if total_energy > best_energy:
-                best_energy = total_energy
-                best_tilt = tilt
-                best_azimuth = azimuth
+    if processes and processes > 1:
+        tasks = [(lat, lon, tilt, azimuth, system_size_kw) for tilt, azimuth in grid]
+        energies = map_shared(_annual_energy, weather_df, tasks, processes, progress)
+    else:
+        # Parse timestamps once for the whole grid
+        energies = []
+        with shared_view(weather_df) as weather:
+            for tilt, azimuth in grid:
+                energies.append(_annual_energy(weather, lat, lon, tilt, azimuth, system_size_kw))
+                if progress is not None:
+                    progress(len(energies), len(grid))
+
+    for (tilt, azimuth), total_energy in zip(grid, energies):
+        if total_energy > best_energy:
+            best_energy = total_energy
+            best_tilt = tilt
+            best_azimuth = azimuth
 
     return best_tilt, best_azimuth, best_energy
+
+
+@profiled("optimizer")
+def sweep_tracker_layouts(weather_df, lat, lon, system_size_kw, gcrs=(0.25, 0.3, 0.35, 0.4, 0.5),
+                          max_angles=(45, 52, 60), axis_azimuth=180, bifacial=False, layout=None, progress=None):
+    """
+    Simulate a single-axis tracker for every gcr / max_angle pair.
+    Row view factors are cached per gcr, so each extra layout costs one
+    vectorized pass over the hours, about the same as a fixed-tilt run.
+    progress(done, total) is called after each layout; raising from it stops the sweep.
+    Returns: DataFrame with GCR, Max Angle (°), Energy (kWh), highest energy first
+    """
+    total = len(gcrs) * len(max_angles)
+    rows = []
+    with shared_view(weather_df) as weather:
+        for gcr in gcrs:
+            for max_angle in max_angles:
+                monthly_energy, _ = simulate_energy_output(
+                    weather, lat, lon, 0, axis_azimuth, system_size_kw, mount="tracker",
+                    bifacial=bifacial, layout={**(layout or {}), "gcr": gcr, "max_angle": max_angle}
+                )
+                rows.append({"GCR": gcr, "Max Angle (°)": max_angle,
+                             "Energy (kWh)": monthly_energy["Energy (kWh)"].sum()})
+                if progress is not None:
+                    progress(len(rows), total)
+
+    return pd.DataFrame(rows).sort_values("Energy (kWh)", ascending=False, kind="stable").reset_index(drop=True)
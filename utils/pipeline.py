@@ -0,0 +1,330 @@
+from collections import OrderedDict
+from contextlib import nullcontext
+import os
+import tempfile
+import threading
+
+import pandas as pd
+
+from utils.weather import fetch_pvgis_tmy, weather_fingerprint
+from utils.simulation import simulate_energy_output
+from utils.financials import calculate_financials
+from utils.optimizer import optimize_tilt_azimuth
+from utils.degradation import estimate_annual_degradation
+from utils.bom_validator import validate_bom
+from utils.risk_classifier import classify_degradation_risk, explain_risk_factors
+from utils.failure_predictor import predict_failure_modes
+from utils.test_recommender import recommend_tests
+from utils.risk_scorer import compute_risk_score
+from utils.report_generator import generate_pdf_report
+from utils.profiling import record, stage as profile_stage
+from utils.jobs import job_key
+
+
+MOUNT_LABELS = {"fixed": "Fixed tilt", "tracker": "Single-axis tracker"}
+
+
+class WeatherUnavailable(Exception):
+    pass
+
+
+class _NoJob:
+    def report(self, stage, payload=None, progress=None, message=None):
+        pass
+
+    def check_cancelled(self):
+        pass
+
+
+class Stage:
+    """
+    One pipeline step. func(inputs, job) receives a dict holding the declared
+    params and the outputs of the declared upstream stages, keyed by name.
+    """
+
+    def __init__(self, name, func, params=(), deps=()):
+        self.name = name
+        self.func = func
+        self.params = tuple(params)
+        self.deps = tuple(deps)
+
+
+class Pipeline:
+    """
+    DAG of stages with a shared output cache.
+    A stage's cache key hashes its own params and its upstream stages' keys,
+    so changing one input only invalidates the stages downstream of it.
+    Stages must be listed in dependency order.
+    """
+
+    def __init__(self, stages, cache_size=256):
+        self.stages = OrderedDict((s.name, s) for s in stages)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def keys(self, params):
+        """
+        Returns: dict of stage name -> input hash for every stage
+        """
+        keys = {}
+        for name, stage in self.stages.items():
+            keys[name] = job_key({
+                "stage": name,
+                "params": {p: params.get(p) for p in stage.params},
+                "deps": [keys[d] for d in stage.deps],
+            })
+        return keys
+
+    def required(self, targets):
+        """
+        Returns: stage names needed for targets, in pipeline order
+        """
+        needed = set()
+        pending = list(targets)
+        while pending:
+            name = pending.pop()
+            if name not in needed:
+                needed.add(name)
+                pending.extend(self.stages[name].deps)
+        return [name for name in self.stages if name in needed]
+
+    def run(self, params, targets=None, job=None, on_stage=None):
+        """
+        Compute targets (default: every stage), reusing cached stage outputs.
+        on_stage(name, output, recomputed) is called as each stage resolves.
+        Returns: (outputs dict, list of recomputed stage names)
+        """
+        job = job or _NoJob()
+        keys = self.keys(params)
+        names = self.required(targets or list(self.stages))
+        outputs = {}
+        recomputed = []
+
+        for i, name in enumerate(names):
+            job.check_cancelled()
+            stage = self.stages[name]
+            hit, output = self._get(keys[name])
+            if not hit:
+                inputs = {p: params.get(p) for p in stage.params}
+                inputs.update({d: outputs[d] for d in stage.deps})
+                with profile_stage(f"pipeline:{name}"):
+                    output = stage.func(inputs, job)
+                self._put(keys[name], output)
+                recomputed.append(name)
+            outputs[name] = output
+            job.report(name, progress=(i + 1) / len(names))
+            if on_stage is not None:
+                on_stage(name, output, not hit)
+
+        return outputs, recomputed
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _get(self, key):
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return True, self._cache[key]
+        return False, None
+
+    def _put(self, key, value):
+        with self._lock:
+            self._cache[key] = value
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+
+# --- Stage functions for the single-site analysis ---
+
+def _weather(inputs, job):
+    weather = fetch_pvgis_tmy(inputs["latitude"], inputs["longitude"])
+    if not isinstance(weather, pd.DataFrame):
+        raise WeatherUnavailable()
+    return {
+        "weather": weather, "weather_fingerprint": weather_fingerprint(weather),
+        "latitude": inputs["latitude"], "longitude": inputs["longitude"],
+    }
+
+
+def _orientation(inputs, job):
+    if inputs["mount"] == "tracker":
+        # Horizontal north-south tracker axis
+        return {"tilt": 0, "azimuth": 180}
+    if not inputs["optimize"]:
+        return {"tilt": inputs["tilt"], "azimuth": inputs["azimuth"]}
+
+    def optimizer_progress(done, total):
+        job.report("optimizer", {"done": done, "total": total},
+                   message=f"Optimizing orientation ({done}/{total})")
+
+    # Energy is linear in system size, so the best orientation for 1 kW is
+    # the best for any size and the stage need not rerun when the size changes
+    weather = inputs["weather"]
+    tilt, azimuth, _ = optimize_tilt_azimuth(
+        weather["weather"], weather["latitude"], weather["longitude"], 1.0, progress=optimizer_progress
+    )
+    return {"tilt": tilt, "azimuth": azimuth}
+
+
+def _bom_feedback(inputs, job):
+    bom_feedback, issue_count = validate_bom(
+        pd.Series(inputs["module"]), pd.Series(inputs["inverter"]), inputs["num_modules"],
+        (inputs["latitude"], inputs["longitude"]), inputs["weather"]["weather"]
+    )
+    return {"bom_feedback": bom_feedback}
+
+
+def _simulation(inputs, job):
+    orientation = inputs["orientation"]
+    monthly_df, hourly_df = simulate_energy_output(
+        inputs["weather"]["weather"], inputs["latitude"], inputs["longitude"],
+        orientation["tilt"], orientation["azimuth"], inputs["system_kw"],
+        mount=inputs["mount"] or "fixed", bifacial=bool(inputs["bifacial"]),
+        layout={"gcr": inputs["gcr"]} if inputs["gcr"] else None
+    )
+    return {"raw_monthly_df": monthly_df, "hourly_df": hourly_df}
+
+
+def _losses(inputs, job):
+    monthly_df = inputs["simulation"]["raw_monthly_df"].copy()
+    monthly_df["Energy (kWh)"] *= (1 - sum(inputs["losses"].values()) / 100)
+    return {"monthly_df": monthly_df}
+
+
+def _degradation(inputs, job):
+    module_temp = inputs["simulation"]["hourly_df"]["Module Temp (°C)"]
+    deg_rate = estimate_annual_degradation(module_temp)
+    return {
+        "deg_rate": deg_rate,
+        "risk_label": classify_degradation_risk(deg_rate),
+        "explanation": explain_risk_factors(module_temp),
+    }
+
+
+def _failures(inputs, job):
+    weather = inputs["weather"]["weather"]
+    failures = predict_failure_modes(pd.Series(inputs["module"]), weather, inputs["encapsulant"])
+    test_plan, rationale = recommend_tests(weather, inputs["encapsulant"])
+    return {"failures": failures, "test_plan": test_plan, "rationale": rationale}
+
+
+def _risk(inputs, job):
+    risk_score, risk_rating = compute_risk_score(
+        inputs["degradation"]["deg_rate"], inputs["failures"]["test_plan"], inputs["failures"]["failures"]
+    )
+    return {"risk_score": risk_score, "risk_rating": risk_rating}
+
+
+def _financials(inputs, job):
+    return {"financials": calculate_financials(
+        inputs["system_kw"], inputs["cost_per_kw"], inputs["energy_price"], inputs["losses"]["monthly_df"]
+    )}
+
+
+def _config(inputs, job):
+    return {"config": {
+        "Latitude": inputs["latitude"],
+        "Longitude": inputs["longitude"],
+        "Tilt": inputs["orientation"]["tilt"],
+        "Azimuth": inputs["orientation"]["azimuth"],
+        "Module": inputs["module"]["Model"],
+        "Inverter": inputs["inverter"]["Model"],
+        "Encapsulant": inputs["encapsulant"],
+        "Mounting": MOUNT_LABELS[inputs["mount"] or "fixed"] + (" (bifacial)" if inputs["bifacial"] else ""),
+        "System Size (kW)": f"{inputs['system_kw']:.2f}"
+    }}
+
+
+def _report(inputs, job):
+    report_dir = tempfile.mkdtemp(prefix="pvsim-")
+    pdf_filename = os.path.join(report_dir, "PVSim_Report.pdf")
+    generate_pdf_report(
+        filename=pdf_filename,
+        config=inputs["config"]["config"],
+        monthly_df=inputs["losses"]["monthly_df"],
+        deg_rate=inputs["degradation"]["deg_rate"],
+        risk_score=inputs["risk"]["risk_score"],
+        risk_label=inputs["degradation"]["risk_label"],
+        failures=inputs["failures"]["failures"],
+        test_plan=inputs["failures"]["test_plan"],
+        financials=inputs["financials"]["financials"],
+        bom_b=inputs["bom_b"]
+    )
+    with open(pdf_filename, "rb") as f:
+        pdf_bytes = f.read()
+    os.remove(pdf_filename)
+    os.rmdir(report_dir)
+    return {"pdf_bytes": pdf_bytes}
+
+
+SITE_STAGES = [
+    Stage("weather", _weather, params=["latitude", "longitude"]),
+    Stage("orientation", _orientation,
+          params=["mount", "optimize", "tilt", "azimuth"], deps=["weather"]),
+    Stage("bom_feedback", _bom_feedback,
+          params=["module", "inverter", "num_modules", "latitude", "longitude"], deps=["weather"]),
+    Stage("simulation", _simulation, params=["system_kw", "latitude", "longitude", "mount", "bifacial", "gcr"],
+          deps=["weather", "orientation"]),
+    Stage("losses", _losses, params=["losses"], deps=["simulation"]),
+    Stage("degradation", _degradation, deps=["simulation"]),
+    Stage("failures", _failures, params=["module", "encapsulant"], deps=["weather"]),
+    Stage("risk", _risk, deps=["degradation", "failures"]),
+    Stage("financials", _financials, params=["system_kw", "cost_per_kw", "energy_price"], deps=["losses"]),
+    Stage("config", _config,
+          params=["latitude", "longitude", "module", "inverter", "encapsulant", "system_kw", "mount", "bifacial"],
+          deps=["orientation"]),
+    Stage("report", _report,
+          params=["bom_b"], deps=["config", "losses", "degradation", "failures", "risk", "financials"]),
+]
+
+# Every stage except the PDF, which is rendered on request
+ANALYSIS_TARGETS = [s.name for s in SITE_STAGES if s.name != "report"]
+
+# Process-wide so sessions and background jobs share cached stage outputs
+site_pipeline = Pipeline(SITE_STAGES)
+
+
+def _publish_partial(job):
+    def on_stage(name, output, recomputed):
+        if name == "weather":
+            job.report("weather", {"rows": len(output["weather"])}, message="Weather loaded")
+        elif name == "orientation":
+            job.report("orientation", dict(output))
+        elif name == "losses":
+            job.report("monthly", output["monthly_df"], message="Monthly energy ready")
+    return on_stage
+
+
+def run_site_analysis(params, job=None):
+    """
+    Single-site pipeline behind app.py's Run Simulation button.
+    params holds plain values (see app.py), plus optional "targets" (stage
+    names, default ANALYSIS_TARGETS) and "profile" (truthy records stage
+    timings; "memory" also tracks allocations, which slows the whole process). job is a utils.jobs.Job
+    that receives partial results and can cancel the run between stages.
+    Returns: dict of results, or None if the weather fetch failed
+    """
+    job = job or _NoJob()
+    targets = params.get("targets") or ANALYSIS_TARGETS
+
+    profile = params.get("profile")
+    with record(track_memory=profile == "memory") if profile else nullcontext() as trace:
+        try:
+            outputs, recomputed = site_pipeline.run(params, targets, job, on_stage=_publish_partial(job))
+        except WeatherUnavailable:
+            return None
+
+    results = {}
+    for name, output in outputs.items():
+        if name != "weather":
+            results.update(output)
+    results.update(outputs["orientation"])
+    results["weather_fingerprint"] = outputs["weather"]["weather_fingerprint"]
+    results.pop("raw_monthly_df", None)
+    results["recomputed"] = recomputed
+    if trace is not None:
+        results["trace"] = trace
+    return results
@@ -0,0 +1,226 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_trace = None
+
+# Active trace and innermost open span for the current thread/task.
+# When no trace is active every instrumented call is a plain passthrough.
+_active_trace = contextvars.ContextVar("pvsim_active_trace", default=None)
+_current_span = contextvars.ContextVar("pvsim_current_span", default=None)
+
+# tracemalloc is process-wide: count the recordings that need it so one
+# finishing does not stop tracing under another
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+_tracemalloc_owned = False
+
+
+class Span:
+    def __init__(self, name, parent, start):
+        self.name = name
+        self.parent = parent
+        self.start = start
+        self.end = None
+        self.rows = None
+        self.mem_delta = None
+        self.thread = threading.get_ident()
+        self._mem_start = None
+        self._otel_cm = None
+        self._otel_span = None
+
+    @property
+    def duration(self):
+        return (self.end or time.perf_counter()) - self.start
+
+
+class Trace:
+    """
+    Collects spans for one pipeline run.
+    """
+
+    def __init__(self, track_memory=False, otel=False):
+        self.track_memory = track_memory
+        self.spans = []
+        self.origin = time.perf_counter()
+        self._tracer = otel_trace.get_tracer("pvsimapp") if otel and otel_trace else None
+
+    def open(self, name):
+        span = Span(name, _current_span.get(), time.perf_counter())
+        if self.track_memory and tracemalloc.is_tracing():
+            span._mem_start = tracemalloc.get_traced_memory()[0]
+        if self._tracer is not None:
+            span._otel_cm = self._tracer.start_as_current_span(name)
+            span._otel_span = span._otel_cm.__enter__()
+        self.spans.append(span)
+        return span, _current_span.set(span)
+
+    def close(self, span, token, rows=None):
+        span.end = time.perf_counter()
+        span.rows = rows
+        if span._mem_start is not None and tracemalloc.is_tracing():
+            span.mem_delta = tracemalloc.get_traced_memory()[0] - span._mem_start
+        if span._otel_cm is not None:
+            if rows is not None:
+                span._otel_span.set_attribute("pvsim.rows", rows)
+            if span.mem_delta is not None:
+                span._otel_span.set_attribute("pvsim.mem_delta_bytes", span.mem_delta)
+            span._otel_cm.__exit__(None, None, None)
+        _current_span.reset(token)
+
+    def summary(self):
+        """
+        Aggregate spans per stage, in order of first call.
+        Memory Δ (KiB) is only included when the trace tracks memory.
+        Returns: list of dicts with Stage, Calls, Total (s), Mean (ms), Rows, Memory Δ (KiB)
+        """
+        stages = {}
+        for span in self.spans:
+            row = stages.setdefault(span.name, {
+                "Stage": span.name, "Calls": 0, "Total (s)": 0.0, "Mean (ms)": 0.0, "Rows": 0,
+                **({"Memory Δ (KiB)": 0.0} if self.track_memory else {})
+            })
+            row["Calls"] += 1
+            row["Total (s)"] += span.duration
+            row["Rows"] += span.rows or 0
+            if self.track_memory:
+                row["Memory Δ (KiB)"] += (span.mem_delta or 0) / 1024
+
+        for row in stages.values():
+            row["Mean (ms)"] = row["Total (s)"] / row["Calls"] * 1000
+        return list(stages.values())
+
+    def to_chrome_trace(self):
+        """
+        Returns: dict in Chrome trace-event format (chrome://tracing, Perfetto).
+        """
+        events = []
+        for span in self.spans:
+            args = {}
+            if span.rows is not None:
+                args["rows"] = span.rows
+            if span.mem_delta is not None:
+                args["mem_delta_bytes"] = span.mem_delta
+            if span.parent is not None:
+                args["parent"] = span.parent.name
+            events.append({
+                "name": span.name,
+                "ph": "X",
+                "ts": (span.start - self.origin) * 1e6,
+                "dur": span.duration * 1e6,
+                "pid": os.getpid(),
+                "tid": span.thread,
+                "args": args,
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def to_json(self, filename):
+        with open(filename, "w") as f:
+            json.dump(self.to_chrome_trace(), f, indent=2)
+        return filename
+
+
+@contextmanager
+def record(track_memory=False, otel=False):
+    """
+    Enable instrumentation for the enclosed block and yield the Trace.
+    track_memory turns on tracemalloc for memory deltas. tracemalloc is
+    process-wide, so this slows every thread while any such recording is open.
+    otel also emits OpenTelemetry spans when opentelemetry is installed.
+    """
+    trace = Trace(track_memory=track_memory, otel=otel)
+    if track_memory:
+        _acquire_tracemalloc()
+    token = _active_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _active_trace.reset(token)
+        if track_memory:
+            _release_tracemalloc()
+
+
+def _acquire_tracemalloc():
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracemalloc_owned = True
+        _tracemalloc_users += 1
+
+
+def _release_tracemalloc():
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        # Leave tracing alone if something outside record() started it
+        if _tracemalloc_users == 0 and _tracemalloc_owned:
+            tracemalloc.stop()
+            _tracemalloc_owned = False
+
+
+@contextmanager
+def stage(name, rows=None):
+    """
+    Time an arbitrary block as a stage of the active trace.
+    """
+    trace = _active_trace.get()
+    if trace is None:
+        yield
+        return
+    span, token = trace.open(name)
+    try:
+        yield
+    finally:
+        trace.close(span, token, rows)
+
+
+def profiled(name, rows=None):
+    """
+    Decorator recording calls to a utils entry point as a stage.
+    rows(args, result) returns the number of rows processed.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            trace = _active_trace.get()
+            if trace is None:
+                return func(*args, **kwargs)
+
+            span, token = trace.open(name)
+            result = None
+            try:
+                result = func(*args, **kwargs)
+                return result
+            finally:
+                count = None
+                if rows is not None:
+                    try:
+                        count = rows(args, result)
+                    except Exception:
+                        count = None
+                trace.close(span, token, count)
+        return wrapper
+    return decorator
+
+
+def arg_rows(index=0):
+    """
+    Row counter for profiled(): length of the positional argument at index.
+    """
+    return lambda args, result: len(args[index])
+
+
+def result_rows(args, result):
+    """
+    Row counter for profiled(): length of the returned object (0 for None).
+    """
+    return len(result) if result is not None else 0
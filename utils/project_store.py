@@ -0,0 +1,252 @@
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from utils.weather import weather_fingerprint
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scenarios (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    name TEXT,
+    site_key TEXT NOT NULL,
+    latitude REAL,
+    longitude REAL,
+    bom_key TEXT NOT NULL,
+    module TEXT,
+    inverter TEXT,
+    encapsulant TEXT,
+    weather_fingerprint TEXT,
+    annual_energy_kwh REAL,
+    deg_rate REAL,
+    risk_score REAL,
+    config_json TEXT NOT NULL,
+    results_json TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_scenarios_site ON scenarios (site_key, created_at);
+CREATE INDEX IF NOT EXISTS idx_scenarios_bom ON scenarios (bom_key, created_at);
+CREATE INDEX IF NOT EXISTS idx_scenarios_weather ON scenarios (weather_fingerprint);
+CREATE TABLE IF NOT EXISTS scenario_monthly (
+    scenario_id INTEGER NOT NULL REFERENCES scenarios (id) ON DELETE CASCADE,
+    month INTEGER NOT NULL,
+    energy_kwh REAL NOT NULL,
+    PRIMARY KEY (scenario_id, month)
+) WITHOUT ROWID;
+"""
+
+SUMMARY_COLUMNS = [
+    "id", "created_at", "name", "latitude", "longitude", "module", "inverter",
+    "encapsulant", "annual_energy_kwh", "deg_rate", "risk_score", "weather_fingerprint",
+]
+
+# Pipeline outputs that are not stored (large or not serializable)
+SKIPPED_RESULTS = {"monthly_df", "hourly_df", "pdf_bytes", "trace", "recomputed"}
+
+
+def site_key(lat, lon):
+    return f"{float(lat):.4f},{float(lon):.4f}"
+
+
+def bom_key(module, inverter, encapsulant):
+    return f"{module}|{inverter}|{encapsulant}"
+
+
+def _to_json(value):
+    if isinstance(value, (np.integer,)):
+        return int(value)
+    if isinstance(value, (np.floating,)):
+        return float(value)
+    if isinstance(value, pd.DataFrame):
+        return value.to_dict("records")
+    return str(value)
+
+
+class ProjectStore:
+    """
+    SQLite store of simulation scenarios: config, weather fingerprint and
+    results, indexed by site and BOM. Uses WAL mode so several Streamlit
+    sessions can read and append at the same time.
+    """
+
+    def __init__(self, path="pvsim_projects.db"):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA foreign_keys=ON")
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def save_scenario(self, config, results=None, weather_df=None, name=None):
+        """
+        Append one scenario. config uses the report keys (Latitude, Longitude,
+        Module, Inverter, Encapsulant, ...); results is the run_site_analysis dict.
+        Returns: new scenario id
+        """
+        return self.save_scenarios([(config, results, weather_df, name)])[0]
+
+    def save_scenarios(self, scenarios):
+        """
+        Append many (config, results, weather_df, name) tuples in one transaction.
+        Returns: list of new scenario ids
+        """
+        ids = []
+        with self._connect() as conn:
+            for config, results, weather_df, name in scenarios:
+                ids.append(self._insert(conn, config, results or {}, weather_df, name))
+        return ids
+
+    def _insert(self, conn, config, results, weather_df, name):
+        monthly_df = results.get("monthly_df")
+        fingerprint = results.get("weather_fingerprint")
+        if fingerprint is None and weather_df is not None:
+            fingerprint = weather_fingerprint(weather_df)
+
+        stored = {k: v for k, v in results.items() if k not in SKIPPED_RESULTS}
+        annual = float(monthly_df["Energy (kWh)"].sum()) if monthly_df is not None else None
+
+        cursor = conn.execute(
+            "INSERT INTO scenarios (created_at, name, site_key, latitude, longitude, bom_key,"
+            " module, inverter, encapsulant, weather_fingerprint, annual_energy_kwh, deg_rate,"
+            " risk_score, config_json, results_json) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                time.time(), name,
+                site_key(config["Latitude"], config["Longitude"]),
+                float(config["Latitude"]), float(config["Longitude"]),
+                bom_key(config.get("Module"), config.get("Inverter"), config.get("Encapsulant")),
+                config.get("Module"), config.get("Inverter"), config.get("Encapsulant"),
+                fingerprint, annual,
+                _optional_float(results.get("deg_rate")),
+                _optional_float(results.get("risk_score")),
+                json.dumps(config, default=_to_json),
+                json.dumps(stored, default=_to_json),
+            )
+        )
+        scenario_id = cursor.lastrowid
+
+        if monthly_df is not None:
+            conn.executemany(
+                "INSERT INTO scenario_monthly (scenario_id, month, energy_kwh) VALUES (?, ?, ?)",
+                [(scenario_id, int(m), float(e)) for m, e in zip(monthly_df["Month"], monthly_df["Energy (kWh)"])]
+            )
+        return scenario_id
+
+    def find_scenarios(self, lat=None, lon=None, module=None, inverter=None, encapsulant=None,
+                       fingerprint=None, limit=100):
+        """
+        Query scenario summaries, newest first. Site and full-BOM filters use the indexes.
+        Returns: DataFrame with SUMMARY_COLUMNS
+        """
+        clauses, args = [], []
+        if lat is not None and lon is not None:
+            clauses.append("site_key = ?")
+            args.append(site_key(lat, lon))
+        if module is not None and inverter is not None and encapsulant is not None:
+            clauses.append("bom_key = ?")
+            args.append(bom_key(module, inverter, encapsulant))
+        else:
+            for column, value in (("module", module), ("inverter", inverter), ("encapsulant", encapsulant)):
+                if value is not None:
+                    clauses.append(f"{column} = ?")
+                    args.append(value)
+        if fingerprint is not None:
+            clauses.append("weather_fingerprint = ?")
+            args.append(fingerprint)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        query = f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM scenarios {where} ORDER BY created_at DESC LIMIT ?"
+        with self._connect() as conn:
+            return pd.read_sql_query(query, conn, params=args + [limit])
+
+    def get_scenario(self, scenario_id):
+        """
+        Returns: dict with id, name, created_at, config, results and monthly_df, or None
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, name, created_at, config_json, results_json FROM scenarios WHERE id = ?",
+                (scenario_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            monthly_df = pd.read_sql_query(
+                'SELECT month AS "Month", energy_kwh AS "Energy (kWh)" FROM scenario_monthly'
+                " WHERE scenario_id = ? ORDER BY month", conn, params=(scenario_id,)
+            )
+        return {
+            "id": row[0],
+            "name": row[1],
+            "created_at": row[2],
+            "config": json.loads(row[3]),
+            "results": json.loads(row[4]) if row[4] else {},
+            "monthly_df": monthly_df,
+        }
+
+    def monthly_energy(self, scenario_ids):
+        """
+        Returns: long DataFrame (Scenario, Month, Energy (kWh)) for many scenarios
+        """
+        placeholders = ", ".join("?" for _ in scenario_ids)
+        with self._connect() as conn:
+            return pd.read_sql_query(
+                'SELECT scenario_id AS "Scenario", month AS "Month", energy_kwh AS "Energy (kWh)"'
+                f" FROM scenario_monthly WHERE scenario_id IN ({placeholders}) ORDER BY scenario_id, month",
+                conn, params=list(scenario_ids)
+            )
+
+    def diff_scenarios(self, id_a, id_b):
+        """
+        Compare two stored scenarios field by field (config, scalar results, monthly energy).
+        Returns: DataFrame with Field, A, B, Changed
+        """
+        a, b = self.get_scenario(id_a), self.get_scenario(id_b)
+        if a is None or b is None:
+            raise KeyError(f"unknown scenario id: {id_a if a is None else id_b}")
+
+        rows = []
+        for section in ("config", "results"):
+            flat_a, flat_b = _flatten(a[section]), _flatten(b[section])
+            for key in list(dict.fromkeys(list(flat_a) + list(flat_b))):
+                val_a, val_b = flat_a.get(key), flat_b.get(key)
+                rows.append({"Field": f"{section}.{key}", "A": val_a, "B": val_b, "Changed": val_a != val_b})
+
+        monthly = a["monthly_df"].merge(b["monthly_df"], on="Month", how="outer", suffixes=(" A", " B"))
+        for _, row in monthly.iterrows():
+            val_a, val_b = row["Energy (kWh) A"], row["Energy (kWh) B"]
+            rows.append({
+                "Field": f"monthly.{int(row['Month'])}", "A": val_a, "B": val_b,
+                "Changed": not np.isclose(val_a, val_b, equal_nan=True)
+            })
+        return pd.DataFrame(rows)
+
+    def delete_scenario(self, scenario_id):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM scenarios WHERE id = ?", (scenario_id,))
+
+
+def _optional_float(value):
+    return float(value) if value is not None else None
+
+
+def _flatten(data, prefix=""):
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{name}."))
+        elif isinstance(value, list):
+            flat[name] = json.dumps(value, default=_to_json)
+        else:
+            flat[name] = value
+    return flat
@@ -1,7 +1,16 @@
 from fpdf import FPDF
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import os
+import tempfile
 import pandas as pd
+from utils.profiling import profiled
+
+def to_latin1(text):
+    """
+    FPDF core fonts are latin-1 only: map arrows/dashes and drop emoji.
+    """
+    text = str(text).replace("→", "->").replace("—", "-").replace("–", "-")
+    return text.encode("latin-1", "ignore").decode("latin-1").strip()
 
 class PDFReport(FPDF):
     def header(self):
@@ -12,18 +21,19 @@ class PDFReport(FPDF):
     def add_section(self, title):
         self.set_font("Arial", "B", 12)
         self.set_fill_color(200, 220, 255)
-        self.cell(0, 10, title, ln=True, fill=True)
+        self.cell(0, 10, to_latin1(title), ln=True, fill=True)
         self.ln(2)
 
     def add_text(self, text):
         self.set_font("Arial", "", 11)
-        self.multi_cell(0, 8, text)
+        self.multi_cell(0, 8, to_latin1(text))
         self.ln(2)
 
     def add_image(self, path, w=180):
         self.image(path, w=w)
         self.ln(5)
 
+@profiled("pdf_report")
 def generate_pdf_report(filename, config, monthly_df, deg_rate, risk_score, risk_label, failures, test_plan, financials, bom_b=None):
     pdf = PDFReport()
     pdf.add_page()
@@ -36,13 +46,19 @@ def generate_pdf_report(filename, config, monthly_df, deg_rate, risk_score, risk
     for idx, row in monthly_df.iterrows():
         pdf.add_text(f"{row['Month']}: {row['Energy (kWh)']:.2f}")
 
+    # Charts go to a private temp dir so concurrent reports don't collide,
+    # and use Figure directly so rendering is safe off the main thread
+    chart_dir = tempfile.mkdtemp(prefix="pvsim-report-")
+    energy_chart = os.path.join(chart_dir, "energy_chart.png")
+    compare_chart = os.path.join(chart_dir, "compare_chart.png")
+
     # Save and embed energy chart
-    fig1 = plt.figure()
-    monthly_df.plot(x='Month', y='Energy (kWh)', kind='bar', legend=False, ax=plt.gca())
-    plt.title('Monthly Energy Output')
-    fig1.savefig("energy_chart.png")
-    pdf.add_image("energy_chart.png")
-    plt.close(fig1)
+    fig1 = Figure()
+    ax1 = fig1.subplots()
+    monthly_df.plot(x='Month', y='Energy (kWh)', kind='bar', legend=False, ax=ax1)
+    ax1.set_title('Monthly Energy Output')
+    fig1.savefig(energy_chart)
+    pdf.add_image(energy_chart)
 
     pdf.add_section("Degradation Analysis")
     pdf.add_text(f"Estimated Annual Degradation: {deg_rate:.2f}%")
@@ -81,15 +97,15 @@ def generate_pdf_report(filename, config, monthly_df, deg_rate, risk_score, risk
             'BOM A': monthly_df['Energy (kWh)'],
             'BOM B': bom_b['monthly_df']['Energy (kWh)']
         })
-        fig2 = plt.figure()
-        comp_df.set_index("Month").plot(kind="bar", ax=plt.gca())
-        plt.title("BOM A vs BOM B - Energy Output")
-        fig2.savefig("compare_chart.png")
-        pdf.add_image("compare_chart.png")
-        plt.close(fig2)
+        fig2 = Figure()
+        ax2 = fig2.subplots()
+        comp_df.set_index("Month").plot(kind="bar", ax=ax2)
+        ax2.set_title("BOM A vs BOM B - Energy Output")
+        fig2.savefig(compare_chart)
+        pdf.add_image(compare_chart)
 
     pdf.output(filename)
-    if os.path.exists("energy_chart.png"):
-        os.remove("energy_chart.png")
-    if os.path.exists("compare_chart.png"):
-        os.remove("compare_chart.png")
+    for path in (energy_chart, compare_chart):
+        if os.path.exists(path):
+            os.remove(path)
+    os.rmdir(chart_dir)
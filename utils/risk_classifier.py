@@ -1,18 +1,54 @@
+import numpy as np
+
+# Label lists indexed by the codes returned by the *_codes functions below
+DEGRADATION_RISK_LABELS = ["🟢 Low Risk", "🟡 Moderate Risk", "🔴 High Risk"]
+RISK_FACTOR_EXPLANATIONS = [
+    "⚠️ High operating temperature increases chemical aging risk. Consider POE encapsulant.",
+    "ℹ️ Medium temp profile — use materials with moderate DH resistance.",
+    "✅ Temperature profile is favorable for long-term reliability.",
+]
+
 def classify_degradation_risk(annual_deg_rate):
     if annual_deg_rate <= 0.5:
-        return "🟢 Low Risk"
+        return DEGRADATION_RISK_LABELS[0]
     elif 0.5 < annual_deg_rate <= 0.75:
-        return "🟡 Moderate Risk"
+        return DEGRADATION_RISK_LABELS[1]
     else:
-        return "🔴 High Risk"
+        return DEGRADATION_RISK_LABELS[2]
 
 def explain_risk_factors(temp_c_series):
     avg_temp = temp_c_series.mean()
     max_temp = temp_c_series.max()
 
     if avg_temp > 35 or max_temp > 55:
-        return "⚠️ High operating temperature increases chemical aging risk. Consider POE encapsulant."
+        return RISK_FACTOR_EXPLANATIONS[0]
     elif avg_temp > 28:
-        return "ℹ️ Medium temp profile — use materials with moderate DH resistance."
+        return RISK_FACTOR_EXPLANATIONS[1]
     else:
-        return "✅ Temperature profile is favorable for long-term reliability."
+        return RISK_FACTOR_EXPLANATIONS[2]
+
+def classify_degradation_risk_codes(annual_deg_rates):
+    """
+    Vectorized classify_degradation_risk.
+    Returns: int8 array of indices into DEGRADATION_RISK_LABELS
+    """
+    rates = np.asarray(annual_deg_rates, dtype=float)
+    return np.select([rates <= 0.5, rates <= 0.75], [0, 1], default=2).astype(np.int8)
+
+def explain_risk_factor_codes(avg_temps, max_temps):
+    """
+    Vectorized explain_risk_factors on per-site mean/max module temperatures.
+    Returns: int8 array of indices into RISK_FACTOR_EXPLANATIONS
+    """
+    avg_temps = np.asarray(avg_temps, dtype=float)
+    max_temps = np.asarray(max_temps, dtype=float)
+    return np.select(
+        [(avg_temps > 35) | (max_temps > 55), avg_temps > 28], [0, 1], default=2
+    ).astype(np.int8)
+
+def render_labels(codes, labels):
+    """
+    Map an array of codes to display strings, e.g.
+    render_labels(classify_degradation_risk_codes(rates), DEGRADATION_RISK_LABELS).
+    """
+    return np.asarray(labels, dtype=object)[codes]
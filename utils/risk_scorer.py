@@ -1,3 +1,10 @@
+import numpy as np
+from utils.profiling import profiled
+
+# Rating codes returned by risk_rating_codes index into this list
+RISK_RATINGS = ["High Risk", "Medium Risk", "Low Risk"]
+
+@profiled("risk_score")
 def compute_risk_score(deg_rate, test_plan, failures):
     # Normalize degradation rate
     deg_score = max(0, 1 - deg_rate / 5)
@@ -17,5 +24,43 @@ def compute_risk_score(deg_rate, test_plan, failures):
     penalty = len(failures) * 0.05
     raw_score = max(0.0, (deg_score + test_score) / 2 - penalty)
 
-    label = "High Risk" if raw_score < 0.4 else "Medium Risk" if raw_score < 0.7 else "Low Risk"
+    label = RISK_RATINGS[0] if raw_score < 0.4 else RISK_RATINGS[1] if raw_score < 0.7 else RISK_RATINGS[2]
     return round(raw_score, 3), label
+
+def compute_risk_scores(deg_rates, dh_hours, uv_exposure, tc_cycles, failure_counts):
+    """
+    Vectorized compute_risk_score for whole fleets (sites x BOMs).
+    Inputs broadcast against each other; failure_counts is the number of
+    rendered failure lines per entry, e.g. failure_flag_matrix(...).sum(axis=-1).
+    NaN inputs behave as in compute_risk_score: a NaN degradation rate
+    contributes 0 and any other NaN makes the score 0 (highest risk).
+    Returns: float array of unrounded scores (higher = lower risk)
+    """
+    # fmax drops NaN like the scalar max(0, x) does
+    deg_score = np.fmax(0, 1 - np.asarray(deg_rates, dtype=float) / 5)
+    test_score = (
+        np.minimum(np.asarray(dh_hours, dtype=float) / 2000, 1.0) * 0.4 +
+        np.minimum(np.asarray(uv_exposure, dtype=float) / 30, 1.0) * 0.3 +
+        np.minimum(np.asarray(tc_cycles, dtype=float) / 300, 1.0) * 0.3
+    )
+    penalty = np.asarray(failure_counts, dtype=float) * 0.05
+    return np.fmax(0.0, (deg_score + test_score) / 2 - penalty)
+
+def risk_rating_codes(scores):
+    """
+    NaN scores are rated High Risk.
+    Returns: int8 array of indices into RISK_RATINGS
+    """
+    scores = np.asarray(scores, dtype=float)
+    return np.select([np.isnan(scores) | (scores < 0.4), scores < 0.7], [0, 1], default=2).astype(np.int8)
+
+def risk_rating_labels(codes):
+    return np.asarray(RISK_RATINGS, dtype=object)[codes]
+
+def rank_by_risk(scores):
+    """
+    NaN scores sort first, as the highest risk.
+    Returns: indices ordering a 1-D score array from highest to lowest risk
+    """
+    scores = np.asarray(scores, dtype=float)
+    return np.argsort(np.where(np.isnan(scores), -np.inf, scores), kind="stable")
@@ -0,0 +1,168 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+# Workers keep a few recently used blocks mapped, so a sweep attaches once per
+# process rather than once per task
+_ATTACHED_LIMIT = 4
+_attached = OrderedDict()
+
+
+class SharedWeather:
+    """
+    Read-only weather frame held in one shared-memory block: parsed UTC
+    timestamps (datetime64), month numbers and the numeric columns as float arrays.
+    Pass .handle (a small dict) to child processes and call
+    SharedWeather.attach(handle) there; column access returns numpy views
+    into the block, with no copying, pickling or timestamp parsing.
+    The creating process owns the block and must close() it (or use it as a
+    context manager) when the sweep is done.
+    """
+
+    def __init__(self, shm, handle, owner=False):
+        self._shm = shm
+        self.handle = handle
+        self._owner = owner
+        self._arrays = {
+            name: np.ndarray((handle["rows"],), dtype=dtype, buffer=shm.buf, offset=offset)
+            for name, dtype, offset in handle["layout"]
+        }
+        self.columns = [name for name, _, _ in handle["layout"] if not name.startswith("_")]
+
+    @classmethod
+    def from_dataframe(cls, weather_df, dtype="float64"):
+        """
+        Copy a PVGIS-style weather frame into a new shared block. The "time"
+        column is parsed once here; every other numeric column is stored as dtype.
+        Returns: SharedWeather owning the block
+        """
+        times = pd.to_datetime(weather_df["time"], utc=True)
+        arrays = {
+            "_time": times.values,
+            "_month": times.dt.month.values,
+        }
+        for name in weather_df.columns:
+            if name != "time" and pd.api.types.is_numeric_dtype(weather_df[name]):
+                arrays[name] = weather_df[name].values.astype(dtype)
+
+        layout, offset = [], 0
+        for name, values in arrays.items():
+            offset = -(-offset // values.itemsize) * values.itemsize
+            layout.append((name, values.dtype.str, offset))
+            offset += values.nbytes
+
+        shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        handle = {"name": shm.name, "rows": len(weather_df), "layout": layout}
+        shared = cls(shm, handle, owner=True)
+        for name, values in arrays.items():
+            shared._arrays[name][:] = values
+        return shared
+
+    @classmethod
+    def attach(cls, handle):
+        """
+        Map an existing block by name. Attachments are cached per process.
+        Returns: SharedWeather view (does not own the block)
+        """
+        name = handle["name"]
+        if name in _attached:
+            _attached.move_to_end(name)
+            return _attached[name]
+
+        # Pool workers share their parent's resource tracker, so the block
+        # stays registered once and is unlinked by the owner's close()
+        shm = shared_memory.SharedMemory(name=name)
+        shared = _attached[name] = cls(shm, handle)
+        while len(_attached) > _ATTACHED_LIMIT:
+            _attached.popitem(last=False)[1]._release()
+        return shared
+
+    def __len__(self):
+        return self.handle["rows"]
+
+    def __getitem__(self, name):
+        return self._arrays[name]
+
+    @property
+    def times(self):
+        """
+        Returns: UTC datetime Series built over the shared timestamp array
+        """
+        return pd.Series(pd.DatetimeIndex(self._arrays["_time"], tz="UTC"))
+
+    @property
+    def months(self):
+        return self._arrays["_month"]
+
+    def to_dataframe(self):
+        """
+        Returns: pandas copy with the time column as UTC timestamps
+        """
+        return pd.DataFrame({"time": self.times, **{c: self[c].copy() for c in self.columns}})
+
+    def _release(self):
+        self._arrays = {}
+        try:
+            self._shm.close()
+        except BufferError:
+            # Views are still referenced; the mapping goes when they do
+            pass
+
+    def close(self):
+        """
+        Unmap the block; the owner also unlinks it.
+        """
+        self._release()
+        if self._owner:
+            self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+@contextmanager
+def shared_view(weather):
+    """
+    Yield weather as a SharedWeather, creating (and afterwards freeing) a
+    block only if a DataFrame was given.
+    """
+    if isinstance(weather, SharedWeather):
+        yield weather
+        return
+    with SharedWeather.from_dataframe(weather) as shared:
+        yield shared
+
+
+def _run_attached(func, handle, args):
+    return func(SharedWeather.attach(handle), *args)
+
+
+def map_shared(func, weather, tasks, processes, progress=None):
+    """
+    Run func(shared_weather, *args) for each args tuple in tasks on a pool of
+    processes. weather (DataFrame or SharedWeather) is put in shared memory
+    once; each task only pickles the block handle and its own args.
+    func must be a module-level function.
+    progress(done, total) is called as tasks finish; raising from it cancels the rest.
+    Returns: list of results in task order
+    """
+    with shared_view(weather) as shared:
+        pool = ProcessPoolExecutor(max_workers=processes)
+        try:
+            futures = [pool.submit(_run_attached, func, shared.handle, tuple(args)) for args in tasks]
+            for done, _ in enumerate(as_completed(futures), start=1):
+                if progress is not None:
+                    progress(done, len(futures))
+            return [future.result() for future in futures]
+        except BaseException:
+            pool.shutdown(cancel_futures=True)
+            raise
+        finally:
+            pool.shutdown()
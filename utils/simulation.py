@@ -1,12 +1,70 @@
 import pandas as pd
 import numpy as np
+from utils.profiling import profiled, arg_rows
+from utils.shared_weather import SharedWeather
+from utils.geometry import (
+    layout_with_defaults, solar_position, split_irradiance, tracker_rotation,
+    surface_orientation, row_shaded_fraction, poa_front, rear_irradiance,
+)
 
-def simulate_energy_output(weather_df, lat, lon, tilt, azimuth, system_kw):
-    irradiance = weather_df["G(i)"].values
-    temp_air = weather_df["T2m"].values
-    wind_speed = weather_df["WS10m"].values
+MOUNTS = ["fixed", "tracker"]
+
+
+@profiled("simulation", rows=arg_rows(0))
+def simulate_energy_output(weather_df, lat, lon, tilt, azimuth, system_kw,
+                           mount="fixed", bifacial=False, layout=None):
+    """
+    Hourly energy model.
+    mount="fixed" uses the PVGIS plane-of-array G(i) at the given tilt/azimuth.
+    mount="tracker" models a horizontal single-axis tracker whose axis points
+    along azimuth (180 = north-south axis); tilt is ignored.
+    bifacial=True adds view-factor rear irradiance scaled by bifaciality.
+    layout overrides utils.geometry.DEFAULT_LAYOUT (gcr, height, albedo,
+    bifaciality, max_angle, backtrack).
+    weather_df may also be a utils.shared_weather.SharedWeather, which skips
+    the timestamp parsing.
+    Returns: (monthly DataFrame, hourly DataFrame)
+    """
+    if mount not in MOUNTS:
+        raise ValueError(f"unknown mount: {mount}")
+
+    temp_air = np.asarray(weather_df["T2m"])
+    wind_speed = np.asarray(weather_df["WS10m"])
+    if isinstance(weather_df, SharedWeather):
+        times, months = weather_df.times, weather_df.months
+    else:
+        times = pd.to_datetime(weather_df["time"], utc=True)
+        months = times.dt.month
+
+    extra_columns = {}
+    if mount == "fixed" and not bifacial:
+        irradiance = np.asarray(weather_df["G(i)"])
+        poa_irradiance = irradiance  # already POA from PVGIS
+    else:
+        layout = layout_with_defaults(layout)
+        zenith, sun_azimuth = solar_position(times, lat, lon)
+        ghi, dni, dhi = split_irradiance(weather_df, zenith, times.dt.dayofyear.values)
+
+        if mount == "tracker":
+            axis_azimuth = azimuth
+            rotation = tracker_rotation(zenith, sun_azimuth, axis_azimuth, layout["max_angle"],
+                                        layout["backtrack"], layout["gcr"])
+            surface_tilt, surface_azimuth = surface_orientation(rotation, axis_azimuth)
+            shaded = row_shaded_fraction(rotation, zenith, sun_azimuth, axis_azimuth, layout["gcr"])
+            irradiance = poa_front(zenith, sun_azimuth, surface_tilt, surface_azimuth,
+                                   ghi, dni, dhi, layout["albedo"], shaded)
+            extra_columns["Tracker Angle (°)"] = rotation
+        else:
+            axis_azimuth = azimuth - 90
+            rotation = np.full(len(weather_df), float(tilt))
+            irradiance = np.asarray(weather_df["G(i)"])
+
+        poa_irradiance = irradiance
+        if bifacial:
+            rear = rear_irradiance(rotation, zenith, sun_azimuth, axis_azimuth, ghi, dni, dhi, layout)
+            poa_irradiance = irradiance + layout["bifaciality"] * rear
+            extra_columns["Rear Irradiance (W/m²)"] = rear
 
-    poa_irradiance = irradiance  # already POA from PVGIS
     module_temp = temp_air + (irradiance * (0.035 / (8.91 + 2.0 * wind_speed)))
     temp_coeff = -0.004  # %/°C
 
@@ -17,15 +75,16 @@ def simulate_energy_output(weather_df, lat, lon, tilt, azimuth, system_kw):
     power_output *= temp_loss
 
     monthly = pd.DataFrame({
-        "Month": pd.to_datetime(weather_df["time"], utc=True).month,
+        "Month": months,
         "Energy (kWh)": power_output / 1000.0
     }).groupby("Month").sum().reset_index()
 
     hourly_details = pd.DataFrame({
-        "Time": pd.to_datetime(weather_df["time"], utc=True),
+        "Time": times,
         "POA Irradiance (W/m²)": poa_irradiance,
         "Module Temp (°C)": module_temp,
-        "Efficiency (%)": (power_output / (poa_irradiance * system_kw + 1e-9)) * 100
+        "Efficiency (%)": (power_output / (poa_irradiance * system_kw + 1e-9)) * 100,
+        **extra_columns,
     })
 
     return monthly, hourly_details
@@ -1,7 +1,19 @@
+import numpy as np
+from utils.profiling import profiled, arg_rows
+from utils.weather import summarize_weather
+
+@profiled("test_plan", rows=arg_rows(0))
 def recommend_tests(weather_df, encapsulant):
-    avg_temp = weather_df["T2m"].mean()
-    avg_rh = weather_df["RH"].mean() if "RH" in weather_df.columns else 60
-    avg_irr = weather_df["G(h)"].mean() if "G(h)" in weather_df.columns else 5.5
+    return recommend_tests_from_summary(summarize_weather(weather_df), encapsulant)
+
+def recommend_tests_from_summary(summary, encapsulant):
+    """
+    Same rules as recommend_tests on a precomputed site summary
+    (see utils.weather.summarize_weather / utils.climate_index).
+    """
+    avg_temp = summary["avg_temp"]
+    avg_rh = summary["avg_rh"] if summary.get("avg_rh") is not None else 60
+    avg_irr = summary["avg_ghi"] if summary.get("avg_ghi") is not None else 5.5
 
     # --- DH Logic ---
     dh_hours = 1000
@@ -43,3 +55,25 @@ def recommend_tests(weather_df, encapsulant):
     ]
 
     return test_plan, rationale
+
+def recommend_test_arrays(avg_temp, avg_rh, avg_irr, encapsulant):
+    """
+    Vectorized recommend_tests_from_summary. Inputs broadcast; NaN humidity
+    or irradiance fall back to the same defaults (60 %, 5.5).
+    Returns: (dh_hours, uv_exposure, tc_cycles) arrays
+    """
+    avg_temp, avg_rh, avg_irr, encapsulant = np.broadcast_arrays(
+        np.asarray(avg_temp, dtype=float), np.asarray(avg_rh, dtype=float),
+        np.asarray(avg_irr, dtype=float), np.asarray(encapsulant)
+    )
+    avg_rh = np.where(np.isnan(avg_rh), 60, avg_rh)
+    avg_irr = np.where(np.isnan(avg_irr), 5.5, avg_irr)
+    is_poe = encapsulant == "POE"
+
+    dh_hours = np.select([(avg_temp > 30) & (avg_rh > 70), avg_temp < 20], [2000, 800], default=1000)
+    uv_exposure = np.select([avg_irr > 6, avg_irr < 4], [30, 10], default=15)
+    tc_cycles = np.select([avg_temp > 30, avg_temp < 15], [300, 250], default=200)
+
+    dh_hours = dh_hours + np.where(is_poe, 200, 0)
+    uv_exposure = uv_exposure + np.where(is_poe, 5, 0)
+    return dh_hours, uv_exposure, tc_cycles
@@ -21,7 +21,7 @@ def plot_hourly_time_series(hourly_df):
     return fig
 
 def plot_loss_waterfall(system_kwh, loss_factors):
-    labels = []
+    labels = ["System Output"]
     values = [system_kwh]
     for name, pct in loss_factors.items():
         labels.append(f"- {name.capitalize()} Loss")
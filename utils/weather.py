@@ -1,12 +1,28 @@
+import hashlib
+import os
+
 import requests
 import pandas as pd
 from io import StringIO
+from utils.profiling import profiled, result_rows
+
+
+def tmy_cache_path(cache_dir, lat, lon):
+    return os.path.join(cache_dir, f"tmy_{lat:.4f}_{lon:.4f}.csv")
+
 
-def fetch_pvgis_tmy(lat, lon):
+@profiled("weather", rows=result_rows)
+def fetch_pvgis_tmy(lat, lon, cache_dir=None):
     """
     Fetch TMY weather data from PVGIS.
+    If cache_dir is given, reuse and store the raw download there.
     Returns: Pandas DataFrame or error message
     """
+    if cache_dir:
+        cached = tmy_cache_path(cache_dir, lat, lon)
+        if os.path.exists(cached):
+            return pd.read_csv(cached)
+
     url = (
         "https://re.jrc.ec.europa.eu/api/tmy?"
         f"lat={lat}&lon={lon}&outputformat=csv&browser=1"
@@ -16,8 +32,43 @@ def fetch_pvgis_tmy(lat, lon):
         if response.status_code == 200:
             csv_data = response.text
             df = pd.read_csv(StringIO(csv_data), skiprows=10)
+            if cache_dir:
+                os.makedirs(cache_dir, exist_ok=True)
+                df.to_csv(tmy_cache_path(cache_dir, lat, lon), index=False)
             return df
         else:
             return None
     except Exception as e:
         return None
+
+
+def summarize_weather(weather_df):
+    """
+    Reduce a weather frame to the site statistics used by the rule-based
+    recommenders (failure modes, test plan, BOM, climate zone).
+    Missing RH / G(h) columns give None.
+    Returns: dict of floats
+    """
+    temp = weather_df["T2m"]
+    irr = weather_df["G(i)"] if "G(i)" in weather_df.columns else None
+    rh = weather_df["RH"] if "RH" in weather_df.columns else None
+
+    return {
+        "avg_temp": float(temp.mean()),
+        "max_temp": float(temp.max()),
+        "min_temp": float(temp.min()),
+        "avg_rh": float(rh.mean()) if rh is not None else None,
+        "avg_ghi": float(weather_df["G(h)"].mean()) if "G(h)" in weather_df.columns else None,
+        "high_uv_hours": float((irr > 900).sum()) if irr is not None else None,
+        "high_humidity_hours": float((rh > 75).sum()) if rh is not None else None,
+        "high_irr_hours": float((irr > 1000).sum()) if irr is not None else None,
+    }
+
+
+def weather_fingerprint(weather_df):
+    """
+    Content hash of a weather frame, so stored results can be matched to the
+    exact weather they were computed from.
+    """
+    hashed = pd.util.hash_pandas_object(weather_df, index=False).values
+    return hashlib.sha1(hashed.tobytes()).hexdigest()